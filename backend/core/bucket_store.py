@@ -0,0 +1,251 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, NamedTuple, Tuple
+
+from core.sqlite_limits_storage import connect_sqlite, sqlite_path_from_uri
+
+
+class BucketSpec(NamedTuple):
+    """
+    A token bucket refilling at `rate` tokens/second up to `burst`.
+    """
+    key: str
+    rate: float
+    burst: float
+
+
+def _refill(spec: BucketSpec, tokens: float, updated: float, now: float) -> float:
+    return min(spec.burst, tokens + max(0.0, now - updated) * spec.rate)
+
+
+def _delay(spec: BucketSpec, tokens: float) -> float:
+    # Seconds until one more token is available (0 if one is available now)
+    return max(0.0, (1.0 - tokens) / spec.rate)
+
+
+class BucketStore(ABC):
+    """
+    Holds token bucket balances. reserve() takes one token from every bucket
+    atomically and returns (granted, delay): the caller may proceed after
+    `delay` seconds, or nothing was taken if the delay exceeds max_delay.
+    Balances may go negative, which records callers still waiting their turn.
+    """
+    @abstractmethod
+    def reserve(self, buckets: List[BucketSpec], max_delay: float) -> Tuple[bool, float]:
+        pass
+
+    @abstractmethod
+    def release(self, buckets: List[BucketSpec]):
+        """
+        Give back a token reserved by a caller that gave up before using it.
+        """
+        pass
+
+    @abstractmethod
+    def tokens(self, spec: BucketSpec) -> float:
+        pass
+
+
+class MemoryBucketStore(BucketStore):
+    """
+    Process-local balances; each uvicorn worker enforces its own limits.
+    """
+    def __init__(self, max_buckets: int = 10_000):
+        self.max_buckets = max_buckets
+        self.lock = threading.Lock()
+        self.state: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def _get(self, spec: BucketSpec, now: float) -> float:
+        tokens, updated = self.state.get(spec.key, (spec.burst, now))
+        return _refill(spec, tokens, updated, now)
+
+    def _put(self, spec: BucketSpec, tokens: float, now: float):
+        self.state[spec.key] = (tokens, now)
+        self.state.move_to_end(spec.key)
+        # Forget the least recently used buckets; an evicted bucket was full or nearly so
+        while len(self.state) > self.max_buckets:
+            self.state.popitem(last=False)
+
+    def reserve(self, buckets: List[BucketSpec], max_delay: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self.lock:
+            balances = [self._get(spec, now) for spec in buckets]
+            delay = max(_delay(spec, tokens) for spec, tokens in zip(buckets, balances))
+            if delay > max_delay:
+                return False, delay
+            for spec, tokens in zip(buckets, balances):
+                self._put(spec, tokens - 1, now)
+            return True, delay
+
+    def release(self, buckets: List[BucketSpec]):
+        now = time.monotonic()
+        with self.lock:
+            for spec in buckets:
+                if spec.key in self.state:
+                    self._put(spec, min(spec.burst, self._get(spec, now) + 1), now)
+
+    def tokens(self, spec: BucketSpec) -> float:
+        with self.lock:
+            return self._get(spec, time.monotonic())
+
+
+class SQLiteBucketStore(BucketStore):
+    """
+    Balances in a SQLite file shared by every worker on one host. BEGIN
+    IMMEDIATE serializes reservations across processes.
+    """
+    # Buckets untouched for this long are full again and can be dropped
+    PRUNE_AFTER_SECONDS = 3600
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self.reservations = 0
+
+    def _get(self, cursor: sqlite3.Cursor, spec: BucketSpec, now: float) -> float:
+        row = cursor.execute("SELECT tokens, updated FROM token_buckets WHERE key = ?", (spec.key,)).fetchone()
+        if row is None:
+            return spec.burst
+        return _refill(spec, row[0], row[1], now)
+
+    def _put(self, cursor: sqlite3.Cursor, spec: BucketSpec, tokens: float, now: float):
+        cursor.execute(
+            "INSERT INTO token_buckets (key, tokens, updated) VALUES (?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+            (spec.key, tokens, now)
+        )
+
+    def _transaction(self, fn):
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(cursor, time.time())
+                cursor.execute("COMMIT")
+                return result
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def reserve(self, buckets: List[BucketSpec], max_delay: float) -> Tuple[bool, float]:
+        def reserve_in(cursor, now):
+            balances = [self._get(cursor, spec, now) for spec in buckets]
+            delay = max(_delay(spec, tokens) for spec, tokens in zip(buckets, balances))
+            if delay > max_delay:
+                return False, delay
+            for spec, tokens in zip(buckets, balances):
+                self._put(cursor, spec, tokens - 1, now)
+
+            self.reservations += 1
+            if self.reservations % 1000 == 0:
+                cursor.execute("DELETE FROM token_buckets WHERE updated < ?", (now - self.PRUNE_AFTER_SECONDS,))
+            return True, delay
+        return self._transaction(reserve_in)
+
+    def release(self, buckets: List[BucketSpec]):
+        def release_in(cursor, now):
+            for spec in buckets:
+                self._put(cursor, spec, min(spec.burst, self._get(cursor, spec, now) + 1), now)
+        self._transaction(release_in)
+
+    def tokens(self, spec: BucketSpec) -> float:
+        with self.lock:
+            return self._get(self.connection.cursor(), spec, time.time())
+
+
+# KEYS: bucket keys. ARGV: now, max_delay, then rate and burst for each key.
+# Returns {granted, delay}; delay is a string because Lua numbers become integers.
+_RESERVE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local max_delay = tonumber(ARGV[2])
+local balances = {}
+local delay = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + 2 * i])
+    local burst = tonumber(ARGV[2 + 2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    balances[i] = tokens
+    delay = math.max(delay, (1 - tokens) / rate)
+end
+if delay > max_delay then
+    return {0, tostring(delay)}
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + 2 * i])
+    local burst = tonumber(ARGV[2 + 2 * i])
+    local tokens = balances[i] - 1
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', key, math.ceil((burst - tokens) / rate) + 1)
+end
+return {1, tostring(math.max(0, delay))}
+"""
+
+_RELEASE_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    local burst = tonumber(ARGV[i])
+    local tokens = tonumber(redis.call('HGET', key, 'tokens'))
+    if tokens then
+        redis.call('HSET', key, 'tokens', tostring(math.min(burst, tokens + 1)))
+    end
+end
+return 1
+"""
+
+
+class RedisBucketStore(BucketStore):
+    """
+    Balances in Redis (or anything speaking its protocol), shared by every
+    worker on every host. Each reservation is a single atomic Lua script.
+    """
+    def __init__(self, uri: str, prefix: str = "token_bucket:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("redis:// rate limit storage requires the 'redis' package") from e
+
+        self.client = redis.Redis.from_url(uri)
+        self.prefix = prefix
+        self.reserve_script = self.client.register_script(_RESERVE_SCRIPT)
+        self.release_script = self.client.register_script(_RELEASE_SCRIPT)
+
+    def reserve(self, buckets: List[BucketSpec], max_delay: float) -> Tuple[bool, float]:
+        args = [time.time(), max_delay]
+        for spec in buckets:
+            args.extend([spec.rate, spec.burst])
+        granted, delay = self.reserve_script(keys=[self.prefix + spec.key for spec in buckets], args=args)
+        return bool(int(granted)), float(delay)
+
+    def release(self, buckets: List[BucketSpec]):
+        self.release_script(
+            keys=[self.prefix + spec.key for spec in buckets],
+            args=[spec.burst for spec in buckets]
+        )
+
+    def tokens(self, spec: BucketSpec) -> float:
+        state = self.client.hmget(self.prefix + spec.key, "tokens", "updated")
+        if state[0] is None:
+            return spec.burst
+        return _refill(spec, float(state[0]), float(state[1]), time.time())
+
+
+def create_bucket_store(uri: str) -> BucketStore:
+    """
+    memory:// (default), sqlite:///path/to/file.db, or redis://host:port/db.
+    """
+    if not uri or uri.startswith("memory://"):
+        return MemoryBucketStore()
+    if uri.startswith("sqlite://"):
+        return SQLiteBucketStore(sqlite_path_from_uri(uri))
+    if uri.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBucketStore(uri)
+    raise ValueError(f"Unsupported rate limit storage URI: {uri}")
@@ -0,0 +1,60 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional
+
+CPU_COUNT = os.cpu_count() or 1
+
+# Model inference runs on its own pool so it never competes with (or stalls)
+# the event loop or Starlette's default threadpool used for other blocking work.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, CPU_COUNT))))
+# Intra-op threads per forward pass; workers * torch threads ~= cores avoids oversubscription
+INFERENCE_TORCH_THREADS = int(os.getenv("INFERENCE_TORCH_THREADS", str(max(1, CPU_COUNT // INFERENCE_WORKERS))))
+
+inference_executor = ThreadPoolExecutor(
+    max_workers=INFERENCE_WORKERS,
+    thread_name_prefix="inference"
+)
+
+async def run_inference(fn, *args, **kwargs):
+    """
+    Run a blocking model call on the inference executor and await the result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_executor, partial(fn, *args, **kwargs))
+
+# CPU-bound pure-Python work (PDF parsing, OCR) runs in worker processes, created
+# on first use. Workers come from a forkserver (spawn where unavailable) rather
+# than forking the API process, so they never inherit torch threads or held
+# locks; their task functions must live in lightweight modules.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, CPU_COUNT))))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(2, CPU_COUNT))))
+
+PROCESS_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_process_pools: Dict[str, ProcessPoolExecutor] = {}
+_process_pools_lock = threading.Lock()
+
+def get_process_pool(name: str, max_workers: int, initializer: Optional[Callable] = None) -> ProcessPoolExecutor:
+    with _process_pools_lock:
+        pool = _process_pools.get(name)
+        if pool is None:
+            pool = _process_pools[name] = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+                initializer=initializer
+            )
+        return pool
+
+def shutdown_executors():
+    """
+    Release executor threads and worker processes on application shutdown.
+    """
+    inference_executor.shutdown(wait=False, cancel_futures=True)
+    with _process_pools_lock:
+        for pool in _process_pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _process_pools.clear()
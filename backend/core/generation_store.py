@@ -0,0 +1,138 @@
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Tuple
+
+from core.sqlite_limits_storage import connect_sqlite, sqlite_path_from_uri
+
+
+class GenerationStore(ABC):
+    """
+    Per-key generation counters used to invalidate caches by changing their
+    keys. A key's generation never returns to a value it had before a bump,
+    so entries cached under an old generation stay unreachable.
+    """
+    @abstractmethod
+    def get(self, key: str) -> int:
+        pass
+
+    @abstractmethod
+    def bump(self, key: str) -> Tuple[int, int]:
+        """
+        Advance the key's generation; returns (previous, current), so a
+        caller can tell whether anyone else bumped it in between.
+        """
+        pass
+
+
+class MemoryGenerationStore(GenerationStore):
+    """
+    Process-local counters; only suitable for a single worker. Bounded by
+    max_keys: generations come from one global counter, and an evicted
+    key reads as the highest generation evicted so far, which is newer
+    than anything it was cached under before its last bump. The counter
+    starts from the clock so a restarted process doesn't repeat generations
+    recorded by an earlier one (e.g. in a persisted vector index).
+    """
+    def __init__(self, max_keys: int = 10_000):
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.counter = itertools.count(time.time_ns())
+        self.floor = 0
+        self.generations: "OrderedDict[str, int]" = OrderedDict()
+
+    def get(self, key: str) -> int:
+        with self.lock:
+            return self.generations.get(key, self.floor)
+
+    def bump(self, key: str) -> Tuple[int, int]:
+        with self.lock:
+            previous = self.generations.get(key, self.floor)
+            current = self.generations[key] = next(self.counter)
+            self.generations.move_to_end(key)
+            while len(self.generations) > self.max_keys:
+                _, evicted = self.generations.popitem(last=False)
+                self.floor = max(self.floor, evicted)
+            return previous, current
+
+
+class SQLiteGenerationStore(GenerationStore):
+    """
+    Counters in a SQLite file shared by every worker on one host.
+    """
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_generations ("
+            " key TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+
+    def get(self, key: str) -> int:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT generation FROM cache_generations WHERE key = ?", (key,)
+            ).fetchone()
+            return row[0] if row else 0
+
+    def bump(self, key: str) -> Tuple[int, int]:
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.execute(
+                    "INSERT INTO cache_generations (key, generation) VALUES (?, 1)"
+                    " ON CONFLICT(key) DO UPDATE SET generation = generation + 1",
+                    (key,)
+                )
+                current = self.connection.execute(
+                    "SELECT generation FROM cache_generations WHERE key = ?", (key,)
+                ).fetchone()[0]
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+            return current - 1, current
+
+
+class RedisGenerationStore(GenerationStore):
+    """
+    Counters in Redis, shared by every worker on every host. A counter
+    expires once it has been idle longer than anything cached under it
+    can live; it then restarts from 0 without reusing a live generation.
+    """
+    def __init__(self, uri: str, entry_ttl: float, prefix: str = "cache_generation:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("redis:// cache storage requires the 'redis' package") from e
+
+        self.client = redis.Redis.from_url(uri)
+        self.prefix = prefix
+        self.expire_seconds = int(entry_ttl * 2) + 60
+
+    def get(self, key: str) -> int:
+        value = self.client.get(self.prefix + key)
+        return int(value) if value is not None else 0
+
+    def bump(self, key: str) -> Tuple[int, int]:
+        pipeline = self.client.pipeline()
+        pipeline.incr(self.prefix + key)
+        pipeline.expire(self.prefix + key, self.expire_seconds)
+        current = pipeline.execute()[0]
+        return current - 1, current
+
+
+def create_generation_store(uri: str, entry_ttl: float) -> GenerationStore:
+    """
+    memory:// (default), sqlite:///path/to/file.db, or redis://host:port/db.
+    entry_ttl is the longest a cache entry keyed by a generation can live.
+    """
+    if not uri or uri.startswith("memory://"):
+        return MemoryGenerationStore()
+    if uri.startswith("sqlite://"):
+        return SQLiteGenerationStore(sqlite_path_from_uri(uri))
+    if uri.startswith(("redis://", "rediss://", "unix://")):
+        return RedisGenerationStore(uri, entry_ttl)
+    raise ValueError(f"Unsupported cache storage URI: {uri}")
@@ -1,5 +1,12 @@
+import os
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+# Registers the sqlite:// scheme with limits
+import core.sqlite_limits_storage  # noqa: F401
+
+# memory:// keeps limits per worker; use sqlite:///path.db (single host) or
+# redis://host:port/db so every uvicorn worker shares the same counters
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
 
 # Use IP address to identify clients for rate limiting
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI)
@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from limits.storage import Storage
+
+
+def sqlite_path_from_uri(uri: str) -> str:
+    """
+    sqlite:///abs/path.db -> /abs/path.db, sqlite://rel.db -> rel.db
+    """
+    parsed = urlparse(uri)
+    return (parsed.netloc + parsed.path) or ":memory:"
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """
+    Open a connection suitable for sharing one file between worker processes.
+    Transactions are managed explicitly with BEGIN IMMEDIATE.
+    """
+    connection = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class SQLiteLimitsStorage(Storage):
+    """
+    Fixed-window counters for slowapi/limits in a SQLite file, so every
+    uvicorn worker on one host shares the same limits. Registered for
+    sqlite:// storage URIs.
+    """
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, **options):
+        super().__init__(uri, **options)
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(sqlite_path_from_uri(uri))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_counters ("
+            " key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS rate_limit_counters_expires_at ON rate_limit_counters (expires_at)"
+        )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: int, amount: int = 1, elastic_expiry: bool = False) -> int:
+        now = time.time()
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired windows (this key's and any others') are dropped as we go
+                cursor.execute("DELETE FROM rate_limit_counters WHERE expires_at <= ?", (now,))
+                cursor.execute(
+                    "INSERT INTO rate_limit_counters (key, count, expires_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET count = count + excluded.count",
+                    (key, amount, now + expiry)
+                )
+                if elastic_expiry:
+                    cursor.execute("UPDATE rate_limit_counters SET expires_at = ? WHERE key = ?", (now + expiry, key))
+                count = cursor.execute("SELECT count FROM rate_limit_counters WHERE key = ?", (key,)).fetchone()[0]
+                cursor.execute("COMMIT")
+                return count
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def get(self, key: str) -> int:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT count FROM rate_limit_counters WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT expires_at FROM rate_limit_counters WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            with self.lock:
+                self.connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self.lock:
+            return self.connection.execute("DELETE FROM rate_limit_counters").rowcount
+
+    def clear(self, key: str) -> None:
+        with self.lock:
+            self.connection.execute("DELETE FROM rate_limit_counters WHERE key = ?", (key,))
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timezone
+from typing import Optional
+from uuid import UUID
+from models.DailySummary import DailySummary
+from services.connect_db import db
+
+
+def _to_model(row: dict) -> DailySummary:
+    return DailySummary(
+        summary_id=row["summary_id"],
+        user_id=row["user_id"],
+        summary_date=date.fromisoformat(row["summary_date"]),
+        summary_content=row["summary_content"],
+        created_at=datetime.fromisoformat(row["created_at"]),
+        source_hash=row.get("source_hash"),
+        updated_at=datetime.fromisoformat(row["updated_at"]) if row.get("updated_at") else None
+    )
+
+
+class DailySummaryDAO:
+    def __init__(self):
+        self.database = db
+
+    async def get(self, user_id: UUID, summary_date: date) -> Optional[DailySummary]:
+        """
+        Retrieve the user's summary for a day, if one was materialized.
+        """
+        response = (
+            await self.database
+            .from_("daily_summaries")
+            .select("*")
+            .eq("user_id", str(user_id))
+            .eq("summary_date", summary_date.isoformat())
+            .execute()
+        )
+        if response.data:
+            return _to_model(response.data[0])
+        return None
+
+    async def upsert(self, user_id: UUID, summary_date: date, summary_content: str, source_hash: str) -> Optional[DailySummary]:
+        """
+        Create or replace the user's summary for a day.
+        """
+        response = (
+            await self.database
+            .from_("daily_summaries")
+            .upsert({
+                "user_id": str(user_id),
+                "summary_date": summary_date.isoformat(),
+                "summary_content": summary_content,
+                "source_hash": source_hash,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }, on_conflict="user_id,summary_date")
+            .execute()
+        )
+        if response.data:
+            return _to_model(response.data[0])
+        return None
+
+    async def delete(self, user_id: UUID, summary_date: date) -> None:
+        """
+        Remove the user's summary for a day (e.g. its last log was deleted).
+        """
+        await (
+            self.database
+            .from_("daily_summaries")
+            .delete()
+            .eq("user_id", str(user_id))
+            .eq("summary_date", summary_date.isoformat())
+            .execute()
+        )
@@ -1,19 +1,60 @@
-from typing import List, Optional
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
 from uuid import UUID
 from models.Log import Log
-from services.connect_db import supabase
+from services.connect_db import db
 from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile, File, Form
 # from services.connect_db import supabase
 
+# Default projection for listings: omits the 384-float embeddings and the fts tsvector
+LOG_LIST_COLUMNS = "log_id,relationship_id,content,date"
+MAX_LOG_PAGE_SIZE = 500
+
+
+def encode_log_cursor(row: dict) -> str:
+    """
+    Opaque keyset cursor pointing just past the given (date, log_id) row.
+    """
+    payload = json.dumps({"date": row["date"], "log_id": row["log_id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_log_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor produced by encode_log_cursor. Raises ValueError if malformed.
+    Both fields are re-serialized from parsed values because they are
+    interpolated into a PostgREST filter string.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        date = datetime.fromisoformat(str(payload["date"]).replace("Z", "+00:00"))
+        log_id = UUID(str(payload["log_id"]))
+        return date.isoformat(), str(log_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def split_log_page(rows: List[dict], page_size: Optional[int]) -> Tuple[List[dict], Optional[str]]:
+    """
+    Trim the look-ahead row fetched by a paged query and return the next cursor.
+    """
+    if not page_size or len(rows) <= page_size:
+        return rows, None
+    page = rows[:page_size]
+    return page, encode_log_cursor(page[-1])
+
 
 class LogDAO:
     def __init__(self):
-        self.database = supabase
+        self.database = db
 
-    def get_by_id(self, id):
+    async def get_by_id(self, id):
         try:
             interaction_response = (
-            self.database
+            await self.database
             .from_("logs")
             .select("relationship_id")
             .eq("log_id", id)
@@ -25,21 +66,115 @@ class LogDAO:
             return ''
 
 
-    def get_by_relationship_id(self, relationship_id: UUID) -> List[Log]:
+    async def get_by_relationship_id(
+        self,
+        relationship_id: UUID,
+        page_size: Optional[int] = None,
+        after: Optional[Tuple[str, str]] = None,
+        include_embeddings: bool = False
+    ) -> List[Log]:
+        """
+        Logs of a relationship, newest first, keyset-paginated on (date, log_id).
+        With a page_size, one extra row is fetched so split_log_page can tell
+        whether another page exists.
+        """
+        columns = f"{LOG_LIST_COLUMNS},embeddings" if include_embeddings else LOG_LIST_COLUMNS
         try:
-            interactions_response = (
+            query = (
                 self.database
                 .from_("logs")
-                .select("*")
+                .select(columns)
                 .eq("relationship_id", relationship_id)
                 .order("date", desc=True)
-                .execute()
+                .order("log_id", desc=True)
             )
+            if after:
+                after_date, after_log_id = after
+                query = query.or_(
+                    f'date.lt."{after_date}",and(date.eq."{after_date}",log_id.lt.{after_log_id})'
+                )
+            if page_size:
+                query = query.limit(page_size + 1)
+
+            interactions_response = await query.execute()
             return interactions_response
         except:
             return ''
 
-    def create(self, log: Log) -> None:
+    async def get_by_user_id(
+        self,
+        user_id: UUID,
+        page_size: Optional[int] = None,
+        after: Optional[Tuple[str, str]] = None,
+        include_embeddings: bool = False
+    ):
+        """
+        Logs across all of a user's relationships in one query, newest first,
+        with the relationship name embedded. Paginated like get_by_relationship_id.
+        """
+        columns = f"{LOG_LIST_COLUMNS},embeddings" if include_embeddings else LOG_LIST_COLUMNS
+        try:
+            query = (
+                self.database
+                .from_("logs")
+                .select(f"{columns},relationships!inner(name,user_id)")
+                .eq("relationships.user_id", user_id)
+                .order("date", desc=True)
+                .order("log_id", desc=True)
+            )
+            if after:
+                after_date, after_log_id = after
+                query = query.or_(
+                    f'date.lt."{after_date}",and(date.eq."{after_date}",log_id.lt.{after_log_id})'
+                )
+            if page_size:
+                query = query.limit(page_size + 1)
+
+            logs_response = await query.execute()
+            return logs_response
+        except:
+            return ''
+
+    async def get_by_ids(self, user_id: UUID, log_ids: List[str]):
+        """
+        The user's logs among log_ids (in no particular order) with the
+        relationship name embedded, in one query.
+        """
+        try:
+            logs_response = (
+                await self.database
+                .from_("logs")
+                .select(f"{LOG_LIST_COLUMNS},relationships!inner(name,user_id)")
+                .eq("relationships.user_id", user_id)
+                .in_("log_id", log_ids)
+                .execute()
+            )
+            return logs_response
+        except:
+            return ''
+
+    async def get_by_user_in_range(self, user_id: UUID, start: str, end: str):
+        """
+        A user's logs dated in [start, end), oldest first, with the
+        relationship name and category embedded.
+        """
+        try:
+            logs_response = (
+                await self.database
+                .from_("logs")
+                .select(f"{LOG_LIST_COLUMNS},relationships!inner(name,category_type,user_id)")
+                .eq("relationships.user_id", user_id)
+                .gte("date", start)
+                .lt("date", end)
+                .order("date")
+                .order("log_id")
+                .execute()
+            )
+            return logs_response
+        except:
+            return ''
+
+    async def create(self, log: Log) -> None:
         """
         Create a new log.
         """
@@ -47,7 +182,7 @@ class LogDAO:
 
         try:
             insert_response = (
-                self.database
+                await self.database
                 .from_("logs")
                 .insert(log)
                 .execute()
@@ -57,13 +192,29 @@ class LogDAO:
         except:
             return ''
 
-    def update(self, data, id):
+    async def create_many(self, logs: List[dict]):
+        """
+        Insert several logs in one multi-row statement. Callers must have
+        checked relationship ownership.
+        """
+        try:
+            insert_response = (
+                await self.database
+                .from_("logs")
+                .insert(logs)
+                .execute()
+            )
+            return insert_response
+        except:
+            return ''
+
+    async def update(self, data, id):
         """
         Update an existing log.
         """
         # Step 2: Update the log
         try:
-            update_response = (self.database
+            update_response = (await self.database
             .from_("logs")
             .update(data)
             .eq("log_id", id)
@@ -76,13 +227,13 @@ class LogDAO:
         # if not update_response.data:
         #     raise HTTPException(status_code=500, detail="Failed to create log"
 
-    def delete(self, log_id: UUID) -> None:
+    async def delete(self, log_id: UUID) -> None:
         """
         Delete a log by its ID.
         """
         try:
             delete_response = (
-                self.database
+                await self.database
                 .from_("logs")
                 .delete()
                 .eq("log_id", log_id)
@@ -91,4 +242,66 @@ class LogDAO:
 
             return delete_response
         except:
-            return ''
\ No newline at end of file
+            return ''
+
+    # Ownership-enforcing mutations (see sql/owned_log_mutations.sql): each is
+    # one round-trip and returns no rows if the log/relationship is not the user's.
+
+    async def create_owned(self, user_id: UUID, log: dict):
+        """
+        Create a log only if its relationship belongs to the user.
+        """
+        try:
+            insert_response = (
+                await self.database
+                .rpc("create_owned_log", {
+                    "p_user_id": user_id,
+                    "p_relationship_id": log["relationship_id"],
+                    "p_content": log["content"],
+                    "p_date": log["date"],
+                    "p_embeddings": log["embeddings"],
+                    "p_log_id": log.get("log_id")
+                })
+                .execute()
+            )
+            return insert_response
+        except:
+            return ''
+
+    async def update_owned(self, user_id: UUID, log_id: UUID, data: dict):
+        """
+        Update a log only if it belongs to one of the user's relationships.
+        Rows come back as {"log": <updated row>, "previous_date": <old date>}.
+        """
+        try:
+            update_response = (
+                await self.database
+                .rpc("update_owned_log", {
+                    "p_user_id": user_id,
+                    "p_log_id": log_id,
+                    "p_content": data["content"],
+                    "p_embeddings": data["embeddings"],
+                    "p_date": data.get("date")
+                })
+                .execute()
+            )
+            return update_response
+        except:
+            return ''
+
+    async def delete_owned(self, user_id: UUID, log_id: UUID):
+        """
+        Delete a log only if it belongs to one of the user's relationships.
+        """
+        try:
+            delete_response = (
+                await self.database
+                .rpc("delete_owned_log", {
+                    "p_user_id": user_id,
+                    "p_log_id": log_id
+                })
+                .execute()
+            )
+            return delete_response
+        except:
+            return ''
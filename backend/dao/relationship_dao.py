@@ -1,20 +1,28 @@
-# from typing import List, Optional
+from typing import Optional
+import os
 from uuid import UUID
-from services.connect_db import supabase
+from services.connect_db import db
 from models.Relationship import Relationship
+from core.ttl_cache import TTLCache
 
+# Positive ownership checks keyed by (user_id, relationship_id); only owned
+# pairs are cached so a miss always falls through to the database.
+ownership_cache = TTLCache(
+    ttl=float(os.getenv("OWNERSHIP_CACHE_TTL", "30")),
+    max_entries=int(os.getenv("OWNERSHIP_CACHE_MAX_ENTRIES", "10000"))
+)
 
 class RelationshipDAO:
     def __init__(self):
-        self.database = supabase
+        self.database = db
 
-    def get_by_id(self, relationship_id: UUID, user_id: UUID):
+    async def get_by_id(self, relationship_id: UUID, user_id: UUID):
         """
         Retrieve a relationship by its ID.
         """
         try:
             relationship_response = (
-                self.database
+                await self.database
                 .from_("relationships")
                 .select("relationship_id")
                 .eq("user_id", user_id)
@@ -25,37 +33,76 @@ class RelationshipDAO:
             return relationship_response
         except:
             return ''
+
+    async def is_owned_by(self, relationship_id: UUID, user_id: UUID) -> bool:
+        """
+        Check that a relationship belongs to the user, using the ownership cache.
+        """
+        key = (str(user_id), str(relationship_id))
+        if ownership_cache.get(key):
+            return True
+
+        relationship_response = await self.get_by_id(relationship_id, user_id)
+        if not relationship_response or not relationship_response.data:
+            return False
+
+        ownership_cache.set(key, True)
+        return True
     
 
-    def get_by_user_id(self, user_id: UUID):
+    async def get_by_user_id(self, user_id: UUID):
         """
         Retrieve all relationships for a specific user.
         """
         try:
-            response = (self.database.from_("relationships").select("*").eq("user_id", user_id).execute())
+            response = (await self.database.from_("relationships").select("*").eq("user_id", user_id).execute())
+            return response
+        except:
+            return ''
+
+    async def get_page_by_user_id(self, user_id: UUID, page_size: int, after: Optional[str] = None):
+        """
+        One page of a user's relationships ordered by relationship_id,
+        starting just past `after` (keyset pagination).
+        """
+        try:
+            query = (
+                self.database
+                .from_("relationships")
+                .select("*")
+                .eq("user_id", user_id)
+                .order("relationship_id")
+                .limit(page_size)
+            )
+            if after:
+                query = query.gt("relationship_id", after)
+            response = await query.execute()
             return response
         except:
             return ''
 
-    def create(self, relationship: Relationship) -> None:
+    async def create(self, relationship: Relationship) -> None:
         """
         Create a new relationship.
         """
         try:
-            create_response = (self.database
+            create_response = (await self.database
                             .from_("relationships")
                             .insert(relationship)
                             .execute())
+            for created in create_response.data or []:
+                ownership_cache.set((str(created["user_id"]), str(created["relationship_id"])), True)
             return create_response
         except:
             return ''
         
-    def update(self, relationship: Relationship, relationship_id : UUID, user_id : UUID) -> None:
+    async def update(self, relationship: Relationship, relationship_id : UUID, user_id : UUID) -> None:
         """
         Update an existing relationship.
         """
+        ownership_cache.pop((str(user_id), str(relationship_id)))
         try:
-            updated_response = (self.database
+            updated_response = (await self.database
             .from_("relationships")
             .update(relationship)
             .eq("relationship_id", relationship_id)
@@ -65,17 +112,21 @@ class RelationshipDAO:
         except:
             return ''
         
-    def delete(self, relationship_id : UUID, user_id : UUID) -> None:
+    async def delete(self, relationship_id : UUID, user_id : UUID) -> None:
         """
-        Update an existing relationship.
+        Delete a relationship (and its logs) if it belongs to the user.
+        Rows come back as {"relationship_id", "log_dates"}.
         """
         try:
-            deleted_response = (self.database
-                        .from_("relationships")
-                        .delete()
-                        .eq("relationship_id", relationship_id)
-                        .eq("user_id", user_id)
+            deleted_response = (await self.database
+                        .rpc("delete_owned_relationship", {
+                            "p_user_id": user_id,
+                            "p_relationship_id": relationship_id
+                        })
                         .execute())
+            # Evict only once the row is gone, so a concurrent is_owned_by
+            # cannot re-cache it in between
+            ownership_cache.pop((str(user_id), str(relationship_id)))
             return deleted_response
         except:
             return ''
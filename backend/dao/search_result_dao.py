@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from models.SearchResult import SearchResult
+from services.connect_db import db
+
+# Listing columns: the log ids, scores and answer are only loaded when a search is re-opened
+RECENT_SEARCH_COLUMNS = "id,user_id,query,search_type,search_date"
+
+
+def _to_model(row: dict) -> SearchResult:
+    return SearchResult(
+        id=row["id"],
+        user_id=row["user_id"],
+        query=row["query"],
+        log_ids=row.get("log_ids") or [],
+        ai_summary=row.get("ai_summary"),
+        search_date=datetime.fromisoformat(row["search_date"]),
+        search_type=row.get("search_type"),
+        scores=row.get("scores") or []
+    )
+
+
+class SearchResultDAO:
+    def __init__(self):
+        self.database = db
+
+    async def create(
+        self,
+        user_id: UUID,
+        query: str,
+        search_type: str,
+        log_ids: List[str],
+        scores: List[float],
+        ai_summary: Optional[str],
+        search_id: Optional[str] = None
+    ) -> Optional[SearchResult]:
+        """
+        Record a search. search_id may be chosen by the caller so it can be
+        returned before the insert completes.
+        """
+        row = {
+            "user_id": str(user_id),
+            "query": query,
+            "search_type": search_type,
+            "log_ids": log_ids,
+            "scores": scores,
+            "ai_summary": ai_summary
+        }
+        if search_id:
+            row["id"] = search_id
+        response = await self.database.from_("search_results").insert(row).execute()
+        if response.data:
+            return _to_model(response.data[0])
+        return None
+
+    async def get_recent(self, user_id: UUID, limit: int = 20) -> List[SearchResult]:
+        """
+        The user's most recent searches, newest first, without their results.
+        """
+        response = (
+            await self.database
+            .from_("search_results")
+            .select(RECENT_SEARCH_COLUMNS)
+            .eq("user_id", str(user_id))
+            .order("search_date", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return [_to_model(row) for row in response.data or []]
+
+    async def get_by_id(self, search_id: UUID, user_id: UUID) -> Optional[SearchResult]:
+        """
+        Retrieve one of the user's searches with its log ids and answer.
+        """
+        response = (
+            await self.database
+            .from_("search_results")
+            .select("*")
+            .eq("id", str(search_id))
+            .eq("user_id", str(user_id))
+            .execute()
+        )
+        if response.data:
+            return _to_model(response.data[0])
+        return None
@@ -8,17 +8,17 @@ from fastapi import HTTPException
 
 load_dotenv()
 sys.path.append(os.getenv('HOME_PATH'))
-from services.connect_db import supabase
+from services.connect_db import db
 
 class UserDAO:
     def __init__(self):
-        self.database = supabase
+        self.database = db
 
-    def get_user_by_id(self, user_id: str) -> Optional[User]:
+    async def get_user_by_id(self, user_id: str) -> Optional[User]:
         """
         Retrieve a user by their ID.
         """
-        response = self.database.table("users").select("*").eq("user_id", str(user_id)).execute()
+        response = await self.database.table("users").select("*").eq("user_id", str(user_id)).execute()
         if response.data:
             user_data = response.data[0]
             return User(
@@ -31,11 +31,11 @@ class UserDAO:
             )
         return None
 
-    def get_user_by_email(self, email: str) -> Optional[User]:
+    async def get_user_by_email(self, email: str) -> Optional[User]:
         """
         Retrieve a user by their email.
         """
-        response = self.database.table("users").select("*").eq("email", email).execute()
+        response = await self.database.table("users").select("*").eq("email", email).execute()
         if response.data:
             user_data = response.data[0]
             return User(
@@ -48,11 +48,11 @@ class UserDAO:
             )
         return None
 
-    def create_user(self, user: dict) -> User:
+    async def create_user(self, user: dict) -> User:
         """
         Create a new user.
         """
-        response = self.database.table("users").insert(user).execute()
+        response = await self.database.table("users").insert(user).execute()
         if response.data:
             created_user = response.data[0]
             return User(
@@ -65,15 +65,15 @@ class UserDAO:
             )
         raise HTTPException(status_code=400, detail="Failed to create user")
 
-    def update_user_last_login(self, user_id: str) -> None:
+    async def update_user_last_login(self, user_id: str) -> None:
         """
         Update the last login timestamp for a user.
         """
-        self.database.table("users").update({"last_login": datetime.now().isoformat()}).eq("user_id", user_id).execute()
+        await self.database.table("users").update({"last_login": datetime.now().isoformat()}).eq("user_id", user_id).execute()
 
-    def check_email_exists(self, email: str) -> bool:
+    async def check_email_exists(self, email: str) -> bool:
         """
         Check if an email is already registered.
         """
-        response = self.database.table("users").select("email").eq("email", email).execute()
+        response = await self.database.table("users").select("email").eq("email", email).execute()
         return bool(response.data)
\ No newline at end of file
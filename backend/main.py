@@ -5,6 +5,8 @@ from routes.summarization import summarization_router
 from routes.search import search_router
 from routes.auth import auth_router
 from routes.calendar import calendar_router
+from routes.jobs import jobs_router
+from routes.export import export_router
 from fastapi import FastAPI, Request, Depends
 from dotenv import load_dotenv
 import os
@@ -13,6 +15,14 @@ from contextlib import asynccontextmanager
 # Use the default handler or create a custom one if needed
 from slowapi.middleware import SlowAPIMiddleware 
 from dotenv import load_dotenv
+from core.executors import shutdown_executors
+from services.embeddings import embedding_cache, embedding_batcher
+from services.connect_db import close_db
+from services.vector_index import vector_indexes
+from services.llm_limiter import llm_limiter
+from services.llm_cache import llm_response_cache
+from services.job_queue import job_queue
+from services.daily_summaries import daily_summaries
 
 # from routes.search import search_router
 
@@ -22,10 +32,21 @@ async def lifespan(app: FastAPI):
     # --- Startup ---
     print("API starting up...")
     # Initialize database connections, models, etc. here if needed
+    await job_queue.start()
+    daily_summaries.start()
     yield
     # --- Shutdown ---
     print("API shutting down...")
-    # Cleanup resources here if needed
+    await job_queue.stop()
+    await daily_summaries.stop()
+    await embedding_batcher.stop()
+    print(f"Embedding cache stats: {embedding_cache.stats()}")
+    print(f"LLM limiter stats: {llm_limiter.metrics()}")
+    print(f"LLM response cache stats: {llm_response_cache.stats()}")
+    embedding_cache.flush()
+    vector_indexes.flush()
+    shutdown_executors()
+    await close_db()
 
 # --- FastAPI App Initialization ---
 app = FastAPI(lifespan=lifespan)
@@ -35,7 +56,7 @@ app = FastAPI(lifespan=lifespan)
 app.add_middleware(SlowAPIMiddleware)
 
 load_dotenv()
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -45,6 +66,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Location", "Content-Disposition"],
 )
 
 # Include routers
@@ -54,6 +76,8 @@ app.include_router(interactions_router, prefix="/interactions")
 app.include_router(calendar_router, prefix="/api/calendar")
 app.include_router(summarization_router, prefix="/summarize", tags=["summarization"])
 app.include_router(search_router, prefix="/api")
+app.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
+app.include_router(export_router, prefix="/export", tags=["export"])
 
 if __name__ == "__main__":
     import uvicorn
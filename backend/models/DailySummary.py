@@ -1,4 +1,5 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional
 from uuid import UUID
 
 class DailySummary:
@@ -6,12 +7,17 @@ class DailySummary:
         self,
         summary_id: UUID,
         user_id: UUID,
-        summary_date: datetime,
+        summary_date: date,
         summary_content: str,
-        created_at: datetime
+        created_at: datetime,
+        source_hash: Optional[str] = None,
+        updated_at: Optional[datetime] = None
     ):
         self.summary_id = summary_id
         self.user_id = user_id
         self.summary_date = summary_date
         self.summary_content = summary_content
-        self.created_at = created_at
\ No newline at end of file
+        self.created_at = created_at
+        # sha256 of the day's logs the summary was generated from
+        self.source_hash = source_hash
+        self.updated_at = updated_at
@@ -1,6 +1,6 @@
 from datetime import datetime
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
 class SearchResult:
     def __init__(
@@ -10,11 +10,16 @@ class SearchResult:
         query: str,
         log_ids: List[UUID],
         ai_summary: str,
-        search_date: datetime
+        search_date: datetime,
+        search_type: Optional[str] = None,
+        scores: Optional[List[float]] = None
     ):
         self.id = id
         self.user_id = user_id
         self.query = query
         self.log_ids = log_ids
         self.ai_summary = ai_summary
-        self.search_date = search_date
\ No newline at end of file
+        self.search_date = search_date
+        self.search_type = search_type
+        # Relevance score of each log in log_ids, same order
+        self.scores = scores
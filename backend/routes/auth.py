@@ -58,7 +58,7 @@ async def login(request: Request, login_data: LoginRequest):
     # Check the rate limit
     rate_limit_login(request)
     try:
-        user = user_dao.get_user_by_email(login_data.email)
+        user = await user_dao.get_user_by_email(login_data.email)
         
         if not user:
             raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -66,7 +66,7 @@ async def login(request: Request, login_data: LoginRequest):
         if not bcrypt.checkpw(login_data.password.encode(), user.password_hash.encode()):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        user_dao.update_user_last_login(user.user_id)
+        await user_dao.update_user_last_login(user.user_id)
         
         access_token = create_jwt_token(str(user.user_id), user.email)
         
@@ -99,7 +99,7 @@ async def signup(request: Request, signup_data: SignUpRequest):
     # Check the rate limit
     rate_limit_signup(request)
     try:
-        if user_dao.check_email_exists(signup_data.email):
+        if await user_dao.check_email_exists(signup_data.email):
             raise HTTPException(status_code=400, detail="Email already registered")
         
         hashed_password = bcrypt.hashpw(signup_data.password.encode(), bcrypt.gensalt()).decode()
@@ -112,7 +112,7 @@ async def signup(request: Request, signup_data: SignUpRequest):
             "status": UserStatus.ACTIVE.value
         }
         
-        created_user = user_dao.create_user(new_user)
+        created_user = await user_dao.create_user(new_user)
         access_token = create_jwt_token(str(created_user.user_id), created_user.email)
         
         # Add Google Calendar auth URL
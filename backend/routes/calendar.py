@@ -14,8 +14,9 @@ from dotenv import load_dotenv
 load_dotenv()
 sys.path.append(os.getenv('HOME_PATH'))
 from services.google_calendar import GoogleCalendar
-from services.connect_db import supabase
+from services.connect_db import db
 from services.event_extractor import extract_events_from_interaction
+from services.llm_limiter import current_llm_user
 
 from routes.auth import verify_jwt_token
 from routes.auth import get_google_credentials
@@ -143,6 +144,34 @@ async def google_oauth_callback(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def extract_events_for_relation(interaction_text: str, relationship_id: str, interaction_date) -> Dict[str, List[Any]]:
+    """Look up the relation and extract events; shared with the background job"""
+    print(f"[DEBUG] Received text for extraction: {interaction_text}")
+    print(f"[DEBUG] Relation ID: {relationship_id}")
+    print(f"[DEBUG] Interaction date: {interaction_date}")
+    
+    # Get relation information from database
+    relation_response = await db.table("relationships").select("*").eq("relationship_id", relationship_id).single().execute()
+    if not relation_response.data:
+        raise HTTPException(status_code=404, detail="Relation not found")
+    
+    relation_info = {
+        "name": relation_response.data.get("name"),
+        "email": relation_response.data.get("email_address"),
+        "company": relation_response.data.get("category_type"),
+        "interaction_date": interaction_date
+    }
+    
+    print(f"[DEBUG] Relation info with date: {relation_info}")
+    
+    events = await extract_events_from_interaction(interaction_text, relation_info)
+    print(f"[DEBUG] Extracted events: {events}")
+    
+    if not events:
+        return {"events": []}
+        
+    return {"events": [event.dict() for event in events]}
+
 @calendar_router.post("/extract-events")
 async def extract_events(
     request: Request,
@@ -171,35 +200,14 @@ async def extract_events(
             raise HTTPException(status_code=400, detail="interaction_text is required")
         if not relationship_id:
             raise HTTPException(status_code=400, detail="relationship_id is required")
-            
-        print(f"[DEBUG] Received text for extraction: {interaction_text}")
-        print(f"[DEBUG] Relation ID: {relationship_id}")
-        print(f"[DEBUG] Interaction date: {interaction_date}")
-        
-        # Get relation information from database
-        relation_response = supabase.table("relationships").select("*").eq("relationship_id", relationship_id).single().execute()
-        if not relation_response.data:
-            raise HTTPException(status_code=404, detail="Relation not found")
-        
-        relation_info = {
-            "name": relation_response.data.get("name"),
-            "email": relation_response.data.get("email_address"),
-            "company": relation_response.data.get("category_type"),
-            "interaction_date": interaction_date
-        }
-        
-        print(f"[DEBUG] Relation info with date: {relation_info}")
-        
-        events = await extract_events_from_interaction(interaction_text, relation_info)
-        print(f"[DEBUG] Extracted events: {events}")
-        
-        if not events:
-            return {"events": []}
-            
-        return {"events": [event.dict() for event in events]}
+
+        current_llm_user.set(token["user_id"])
+        return await extract_events_for_relation(interaction_text, relationship_id, interaction_date)
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON body")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[DEBUG] Error in extract_events: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
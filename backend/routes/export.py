@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
+import os
+import sys
+from dotenv import load_dotenv
+load_dotenv()
+sys.path.append(os.getenv('HOME_PATH'))
+
+from services.log_export import LogExporter
+from routes.auth import verify_jwt_token
+
+export_router = APIRouter()
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+@export_router.get("/")
+async def export_account(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    include_embeddings: bool = False,
+    embedding_format: str = Query("list", regex="^(list|float32|float16|int8)$"),
+    token: dict = Depends(verify_jwt_token)
+):
+    """
+    Download all of the user's relationships followed by all of their logs
+    (newest first), streamed page by page as NDJSON or CSV.
+    """
+    exporter = LogExporter(token["user_id"], include_embeddings, embedding_format)
+
+    async def chunks():
+        try:
+            async for chunk in exporter.stream(format):
+                yield chunk
+        except Exception as e:
+            print(f"[ERROR] Export for {token['user_id']} failed: {e}", file=sys.stderr)
+            if format == "ndjson":
+                yield '{"type": "error", "error": "Export failed"}\n'
+            else:
+                # CSV has no error row; abort so the client sees a truncated download
+                raise
+
+    filename = f"logbook-export-{datetime.now(timezone.utc):%Y%m%d}.{format}"
+    return StreamingResponse(
+        chunks(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
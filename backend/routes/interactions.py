@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile, File, Form, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, validator, Field, validator
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
+import asyncio
+import json
 import uuid
 
 import os
@@ -10,10 +13,14 @@ from dotenv import load_dotenv
 load_dotenv()
 sys.path.append(os.getenv('HOME_PATH'))
 # from services.connect_db import supabase
-from services.embeddings import get_embeddings
+from services.embeddings import get_embeddings_async
+from services.vector_codec import parse_pgvector, to_pgvector, encode_vector
+from services import log_changes
+from services.log_import import LogImporter, IMPORT_FORMATS
+from services.upload_spool import spool_upload
 from routes.auth import verify_jwt_token
 import numpy as np
-from dao.log_dao import LogDAO as LogDao
+from dao.log_dao import LogDAO as LogDao, decode_log_cursor, split_log_page, MAX_LOG_PAGE_SIZE
 from dao.relationship_dao import RelationshipDAO as RelationDao
 
 interactions_router = APIRouter()
@@ -24,17 +31,18 @@ class Log(BaseModel):
     content: str
     date: datetime
     fts: Optional[str] = None  # For tsvector
-    embeddings: List[float] = Field(
-        ...,  # Make it required
-        description="384-dimensional vector for semantic search"
+    embeddings: Optional[Union[List[float], str]] = Field(
+        None,  # Omitted from listings unless include_embeddings is set
+        description="384-dimensional vector for semantic search, as a float list or base64 (see embedding_format)"
     )
 
     @validator('embeddings', pre=True)
     def parse_embeddings(cls, v):
-        if isinstance(v, str):
-            # Remove brackets and split by comma
-            cleaned = v.strip('[]')
-            return [float(x) for x in cleaned.split(',')]
+        if isinstance(v, str) and v.startswith('['):
+            # pgvector literal from the database, parsed in C
+            return parse_pgvector(v).tolist()
+        if isinstance(v, np.ndarray):
+            return v.tolist()
         return v
 
     class Config:
@@ -55,10 +63,11 @@ class LogRequest(BaseModel):
 
     @validator('embeddings', pre=True)
     def parse_embeddings(cls, v):
-        if isinstance(v, str):
-            # Remove brackets and split by comma
-            cleaned = v.strip('[]')
-            return [float(x) for x in cleaned.split(',')]
+        if isinstance(v, str) and v.startswith('['):
+            # pgvector literal from the database, parsed in C
+            return parse_pgvector(v).tolist()
+        if isinstance(v, np.ndarray):
+            return v.tolist()
         return v
 
     class Config:
@@ -72,6 +81,41 @@ class LogRequest(BaseModel):
     content: str
     date: datetime
 
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(100 * 1024 * 1024)))
+
+@interactions_router.post("/import")
+async def import_interactions(
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    token: dict = Depends(verify_jwt_token)
+):
+    """
+    Bulk-import logs from a CSV (header: relationship_id,content,date) or
+    JSONL file. Streams NDJSON events: per-row `error`s, a `progress` line
+    per batch, and a final `done` with the totals.
+    """
+    user_id = token["user_id"]
+    fmt = (format or os.path.splitext(file.filename or "")[1].lstrip(".")).lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(IMPORT_FORMATS)}")
+
+    # The upload is closed once this handler returns, so stream from our own copy
+    spooled = await asyncio.to_thread(spool_upload, file.file, file.filename, IMPORT_MAX_BYTES)
+
+    async def events():
+        try:
+            async for event in LogImporter(user_id).run(spooled, fmt):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            print(f"Error importing interactions: {str(e)}")
+            yield json.dumps({"type": "error", "row": None, "error": "Import failed"}) + "\n"
+        finally:
+            spooled.close()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @interactions_router.post("/relationship/{relationship_id}", response_model=Log)
 async def create_interaction(
     relationship_id: str, 
@@ -81,25 +125,8 @@ async def create_interaction(
     try:
         user_id = token["user_id"]
         
-        # Check if the relationship belongs to the user
-        # relationship_response = (
-        #     supabase
-        #     .from_("relationships")
-        #     .select("relationship_id")
-        #     .eq("user_id", user_id)
-        #     .eq("relationship_id", relationship_id)
-        #     .single()
-        #     .execute()
-        # )
-
-        relationDao = RelationDao()
-        relationship_response = relationDao.get_by_id(relationship_id, user_id)
-        
-        if not relationship_response.data:
-            raise HTTPException(status_code=403, detail="Unauthorized: Relationship does not belong to user")
-        
         # Generate embeddings for the content
-        embeddings = get_embeddings(interaction.content)
+        embeddings = await get_embeddings_async(interaction.content)
         
         # Create new log record
         new_log = {
@@ -107,23 +134,17 @@ async def create_interaction(
             "relationship_id": relationship_id,
             "content": interaction.content,
             "date": interaction.date.isoformat(),
-            "embeddings": embeddings
+            "embeddings": to_pgvector(embeddings)
         }
         
-        # Insert into database
-        # insert_response = (
-        #     supabase
-        #     .from_("logs")
-        #     .insert(new_log)
-        #     .execute()
-        # )
-
+        # Ownership check and insert happen in a single round-trip
         logDao = LogDao()
-        insert_response = logDao.insert(new_log)
+        insert_response = await logDao.create_owned(user_id, new_log)
         
         if not insert_response.data:
-            raise HTTPException(status_code=500, detail="Failed to create log")
+            raise HTTPException(status_code=403, detail="Unauthorized: Relationship does not belong to user")
         
+        await log_changes.log_saved(user_id, insert_response.data[0], embeddings)
         return insert_response.data[0]
         
     except Exception as e:
@@ -135,50 +156,29 @@ async def update_interactions(interaction_id: str, interaction: LogRequest, toke
     try:
         user_id = token["user_id"]
 
-        # Step 1: Check if the relationship_id belongs to the user
-        # relationship_response = (
-        #     supabase
-        #     .from_("relationships")
-        #     .select("relationship_id")
-        #     .eq("user_id", user_id)
-        #     .eq("relationship_id", interaction.relationship_id)
-        #     .single()
-        #     .execute()
-        # )
-
-        relationDao = RelationDao()
-        relationship_response = relationDao.get_by_id(interaction.relationship_id, user_id)
-
-        if not relationship_response.data:
-            raise HTTPException(status_code=403, detail="Unauthorized: Relationship does not belong to user")
-        
         # Prepare update data
         update_data = {
             "content": interaction.content
         }
         
-        update_data["embeddings"] = get_embeddings(interaction.content)
+        embeddings = await get_embeddings_async(interaction.content)
+        update_data["embeddings"] = to_pgvector(embeddings)
         
         # Handle date conversion
         if interaction.date:
             update_data["date"] = interaction.date.isoformat()
 
-        # Step 2: Update the log
-        # update_response = (
-        #     supabase
-        #     .from_("logs")
-        #     .update(update_data)
-        #     .eq("log_id", interaction_id)
-        #     .execute()
-        # )
-
+        # Update only if the log belongs to one of the user's relationships
         logDao = LogDao()
-        update_response = logDao.update(update_data, interaction_id)
+        update_response = await logDao.update_owned(user_id, interaction_id, update_data)
 
         if not update_response.data:
-            raise HTTPException(status_code=500, detail="Failed to update log")
+            raise HTTPException(status_code=404, detail="Interaction not found or not authorized")
 
-        return update_response.data[0]
+        # previous_date lets the day the log moved away from be refreshed too
+        updated = update_response.data[0]
+        await log_changes.log_saved(user_id, updated["log"], embeddings, updated["previous_date"])
+        return updated["log"]
 
     except Exception as e:
         print(f"Error updating interaction: {str(e)}")
@@ -188,54 +188,15 @@ async def update_interactions(interaction_id: str, interaction: LogRequest, toke
 async def delete_interaction(interaction_id: str, token: dict = Depends(verify_jwt_token)):
     try:
         user_id = token["user_id"]
-        # print("hello")
-        # First, get the interaction to check relationship_id
-        # interaction_response = (
-        #     supabase
-        #     .from_("logs")
-        #     .select("relationship_id")
-        #     .eq("log_id", interaction_id)
-        #     .single()
-        #     .execute()
-        # )
 
+        # Delete only if the log belongs to one of the user's relationships
         logDao = LogDao()
-        interaction_response = logDao.get_by_id(interaction_id)
-
-        if not interaction_response.data:
-            raise HTTPException(status_code=404, detail="Interaction not found")
-
-        # Check if the relationship belongs to the user
-        # relationship_response = (
-        #     supabase
-        #     .from_("relationships")
-        #     .select("relationship_id")
-        #     .eq("user_id", user_id)
-        #     .eq("relationship_id", interaction_response.data["relationship_id"])
-        #     .single()
-        #     .execute()
-        # )
-
-        relationDao = RelationDao()
-        relationship_response = relationDao.get_by_id(interaction_response.data["relationship_id"], user_id)
-
-        if not relationship_response.data:
-            raise HTTPException(status_code=403, detail="Unauthorized: Cannot delete this interaction")
-
-        # Delete the interaction
-        delete_response = logDao.delete(interaction_id) 
-        # delete_response = (
-        #     supabase
-        #     .from_("logs")
-        #     .delete()
-        #     .eq("log_id", interaction_id)
-        #     .execute()
-        # )
-
+        delete_response = await logDao.delete_owned(user_id, interaction_id)
 
         if not delete_response.data:
-            raise HTTPException(status_code=500, detail="Failed to delete interaction")
+            raise HTTPException(status_code=404, detail="Interaction not found or not authorized")
 
+        await log_changes.log_deleted(user_id, interaction_id, delete_response.data[0].get("date"))
         return {"message": "Interaction deleted successfully"}
 
     except Exception as e:
@@ -243,19 +204,47 @@ async def delete_interaction(interaction_id: str, token: dict = Depends(verify_j
         raise HTTPException(status_code=500, detail=f"Failed to delete interaction: {str(e)}")
 
 @interactions_router.get("/relationship/{relationship_id}", response_model=List[Log])
-async def get_interactions_by_relationship(relationship_id: str, token: dict = Depends(verify_jwt_token)):
+async def get_interactions_by_relationship(
+    relationship_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LOG_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_embeddings: bool = False,
+    embedding_format: str = Query("list", regex="^(list|float32|float16|int8)$"),
+    token: dict = Depends(verify_jwt_token)
+):
+    """
+    List interactions newest first. Pass limit to page; the cursor for the
+    next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        after = decode_log_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         user_id = token["user_id"]
         # Check if the relationship belongs to the user
         relationDao = RelationDao()
-        relationship_response = relationDao.get_by_id(relationship_id, user_id)
-
-        if not relationship_response.data:
+        if not await relationDao.is_owned_by(relationship_id, user_id):
             raise HTTPException(status_code=403, detail="Unauthorized: Relationship does not belong to user")
         
-        # Get all interactions for the relationship
+        # Get a page of interactions for the relationship
         logDao = LogDao()
-        data = logDao.get_by_relationship_id(relationship_id)
+        logs_response = await logDao.get_by_relationship_id(
+            relationship_id,
+            page_size=limit,
+            after=after,
+            include_embeddings=include_embeddings
+        )
+        data, next_cursor = split_log_page(logs_response.data, limit)
+        if include_embeddings and embedding_format != "list":
+            # Compact base64 vectors instead of JSON float lists
+            for row in data:
+                if row.get("embeddings"):
+                    row["embeddings"] = encode_vector(parse_pgvector(row["embeddings"]), embedding_format)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
 
         return data
         
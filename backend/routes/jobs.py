@@ -0,0 +1,135 @@
+# routes/jobs.py
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+load_dotenv()
+sys.path.append(os.getenv('HOME_PATH'))
+
+from services.job_queue import job_queue, JOB_SUCCEEDED, JOB_FAILED, JOB_FILES_DIR
+from services.gemini import summarize_spooled_file, summarize_daily_interactions
+from services.upload_spool import spool_upload
+from routes.summarization import InteractionsPayload, InteractionModel
+from routes.calendar import extract_events_for_relation
+from routes.auth import verify_jwt_token, get_google_credentials
+
+jobs_router = APIRouter()
+
+# --- Job handlers (run by the queue's workers; inputs and results are JSON) ---
+
+async def run_summarize_file(input_path: str, file_name: Optional[str]) -> dict:
+    with open(input_path, "rb") as spooled:
+        return {"summary": await summarize_spooled_file(spooled, file_name)}
+
+async def run_summarize_daily(interactions: list) -> dict:
+    return {"summary": await summarize_daily_interactions([InteractionModel(**i) for i in interactions])}
+
+async def run_extract_events(interaction_text: str, relationship_id: str, interaction_date: Optional[str]) -> dict:
+    return await extract_events_for_relation(interaction_text, relationship_id, interaction_date)
+
+job_queue.register("summarize_file", run_summarize_file,
+                   concurrency=int(os.getenv("JOB_WORKERS_SUMMARIZE_FILE", "2")))
+job_queue.register("summarize_daily", run_summarize_daily,
+                   concurrency=int(os.getenv("JOB_WORKERS_SUMMARIZE_DAILY", "2")))
+job_queue.register("extract_events", run_extract_events,
+                   concurrency=int(os.getenv("JOB_WORKERS_EXTRACT_EVENTS", "4")))
+
+
+def accepted(job_id: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued"},
+        headers={"Location": f"/jobs/{job_id}"}
+    )
+
+# --- Submit ---
+
+@jobs_router.post("/summarize/file")
+async def submit_summarize_file(
+    file: UploadFile = File(...),
+    token: dict = Depends(verify_jwt_token)
+):
+    """
+    Queue a file summary. The upload is spooled to JOB_FILES_DIR now, since the
+    request ends before the job runs; the queue deletes it when the job is done.
+    """
+    spooled = await asyncio.to_thread(
+        spool_upload, file.file, file.filename, directory=JOB_FILES_DIR, delete=False
+    )
+    spooled.close()
+    job_id = await job_queue.submit(
+        token["user_id"], "summarize_file",
+        input_path=os.path.abspath(spooled.name), file_name=file.filename
+    )
+    return accepted(job_id)
+
+@jobs_router.post("/summarize/daily")
+async def submit_summarize_daily(
+    payload: InteractionsPayload,
+    token: dict = Depends(verify_jwt_token)
+):
+    job_id = await job_queue.submit(
+        token["user_id"], "summarize_daily",
+        interactions=[interaction.dict() for interaction in payload.interactions]
+    )
+    return accepted(job_id)
+
+class ExtractEventsRequest(BaseModel):
+    interaction_text: str
+    relationship_id: str
+    interaction_date: Optional[str] = None
+
+@jobs_router.post("/calendar/extract-events")
+async def submit_extract_events(
+    data: ExtractEventsRequest,
+    google_credentials: dict = Depends(get_google_credentials),
+    token: dict = Depends(verify_jwt_token)
+):
+    job_id = await job_queue.submit(
+        token["user_id"], "extract_events",
+        interaction_text=data.interaction_text,
+        relationship_id=data.relationship_id,
+        interaction_date=data.interaction_date
+    )
+    return accepted(job_id)
+
+# --- Poll / fetch ---
+
+async def get_owned_job(job_id: str, user_id: str) -> dict:
+    job = await job_queue.get(job_id)
+    # Someone else's job is reported as missing rather than forbidden
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@jobs_router.get("/{job_id}")
+async def get_job(job_id: str, token: dict = Depends(verify_jwt_token)):
+    """
+    Job status: queued, running, succeeded or failed (with error).
+    """
+    job = await get_owned_job(job_id, token["user_id"])
+    return {
+        "job_id": job["job_id"],
+        "job_type": job["job_type"],
+        "status": job["status"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    }
+
+@jobs_router.get("/{job_id}/result")
+async def get_job_result(job_id: str, token: dict = Depends(verify_jwt_token)):
+    """
+    The job's result once it succeeded; 202 while it is still pending.
+    """
+    job = await get_owned_job(job_id, token["user_id"])
+    if job["status"] == JOB_SUCCEEDED:
+        return job["result"]
+    if job["status"] == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": job["status"]})
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Response
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 import numpy as np
 from pytz import timezone
@@ -11,10 +11,12 @@ from dotenv import load_dotenv
 load_dotenv()
 sys.path.append(os.getenv('HOME_PATH'))
 # from services.connect_db import supabase
-from services.embeddings import get_embeddings
+from services.embeddings import get_embeddings_async
+from services.vector_codec import parse_pgvector, to_pgvector, encode_vector
+from services import log_changes
 
 from dao.relationship_dao import RelationshipDAO
-from dao.log_dao import LogDAO
+from dao.log_dao import LogDAO, decode_log_cursor, split_log_page, MAX_LOG_PAGE_SIZE
 from routes.auth import verify_jwt_token
 
 relationship_router = APIRouter()
@@ -43,17 +45,18 @@ class Log(BaseModel):
     content: str
     date: datetime
     fts: Optional[str] = None  # For tsvector
-    embeddings: List[float] = Field(
-        ...,  # Make it required
-        description="384-dimensional vector for semantic search"
+    embeddings: Optional[Union[List[float], str]] = Field(
+        None,  # Omitted from listings unless include_embeddings is set
+        description="384-dimensional vector for semantic search, as a float list or base64 (see embedding_format)"
     )
 
     @validator('embeddings', pre=True)
     def parse_embeddings(cls, v):
-        if isinstance(v, str):
-            # Remove brackets and split by comma
-            cleaned = v.strip('[]')
-            return [float(x) for x in cleaned.split(',')]
+        if isinstance(v, str) and v.startswith('['):
+            # pgvector literal from the database, parsed in C
+            return parse_pgvector(v).tolist()
+        if isinstance(v, np.ndarray):
+            return v.tolist()
         return v
 
     class Config:
@@ -73,7 +76,7 @@ async def get_all_relationships(token: dict = Depends(verify_jwt_token)):
     try:
         user_id = token["user_id"]
         relationshipDao = RelationshipDAO()
-        response = relationshipDao.get_by_user_id(user_id)
+        response = await relationshipDao.get_by_user_id(user_id)
         # response = relationDao.get_by_user_id(user_id)
         # print("yo hu ho he")
         # response = supabase.table("relationships").select("*").eq("user_id", user_id).execute()
@@ -89,7 +92,7 @@ async def get_relationship(relationship_id: str, token: str = Depends(verify_jwt
     try:
         user_id = token["user_id"]
         relationDao = RelationshipDAO() 
-        response = relationDao.get_by_id(relationship_id, user_id)
+        response = await relationDao.get_by_id(relationship_id, user_id)
         # response = supabase.table("relationships").select("*").eq("relationship_id", relationship_id).eq("user_id", user_id).execute()
         if not response.data:
             raise HTTPException(status_code=404, detail="Relationship not found")
@@ -108,9 +111,11 @@ async def add_relationship(relationship: RelationshipRequest, token: dict = Depe
         new_relationship = relationship.dict()
         new_relationship["user_id"] = user_id
         relationshipDao = RelationshipDAO()
-        create_response = relationshipDao.create(new_relationship)
+        create_response = await relationshipDao.create(new_relationship)
         print("Supabase response:", create_response, flush=True)  # Debug statement
-        return  create_response.data[0]
+        created = create_response.data[0]
+        await log_changes.relationship_saved(user_id, created["relationship_id"], created["name"])
+        return created
     except Exception as e:
         print("Error in add_relationship:", e, flush=True)  # Debug statement
         raise HTTPException(status_code=500, detail="Failed to add relationship")
@@ -122,10 +127,11 @@ async def update_relationship(relationship_id: str, relationship: RelationshipRe
         user_id = token["user_id"]
         update_relationship = relationship.dict()
         relationDao = RelationshipDAO()
-        updated_response = relationDao.update(update_relationship, relationship_id, user_id)
+        updated_response = await relationDao.update(update_relationship, relationship_id, user_id)
         # response = supabase.table("relationships").update(update_relationship).eq("relationship_id", relationship_id).eq("user_id", user_id).execute()
         if not updated_response.data:
             raise HTTPException(status_code=404, detail="Relationship not found or not authorized")
+        await log_changes.relationship_saved(user_id, relationship_id, updated_response.data[0]["name"])
         return updated_response.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to update relationship")
@@ -136,35 +142,61 @@ async def delete_relationship(relationship_id: str, token: dict = Depends(verify
     try:
         user_id = token["user_id"]
         relationshipDao = RelationshipDAO()
-        deleted_response = relationshipDao.delete(relationship_id, user_id)
+        deleted_response = await relationshipDao.delete(relationship_id, user_id)
         # response = supabase.table("relationships").delete().eq("relationship_id", relationship_id).eq("user_id", user_id).execute()
         if not deleted_response.data:
             raise HTTPException(status_code=404, detail="Relationship not found or not authorized")
+        # The delete returns the dates of the logs removed with the relationship
+        log_dates = deleted_response.data[0]["log_dates"] or []
+        await log_changes.relationship_deleted(user_id, relationship_id, log_dates)
         return {"message": "Relationship deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to delete relationship")
     
 @relationship_router.get("/{relationship_id}/interactions")
-async def list_interactions(relationship_id: str, token: dict = Depends(verify_jwt_token)):
+async def list_interactions(
+    relationship_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LOG_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_embeddings: bool = False,
+    embedding_format: str = Query("list", regex="^(list|float32|float16|int8)$"),
+    token: dict = Depends(verify_jwt_token)
+):
+    try:
+        after = decode_log_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         print("[DEBUG] Received request to list interactions for relationship_id")
         user_id = token["user_id"]
         try: 
             # Check if the relationship exists and belongs to the user
             relationshipDao = RelationshipDAO()
-            relationship_response = relationshipDao.get_by_id(relationship_id, user_id)
-            # relationship_response = supabase.table("relationships").select("*").eq("relationship_id", relationship_id).eq("user_id", user_id).execute()
-            if not relationship_response.data:
+            if not await relationshipDao.is_owned_by(relationship_id, user_id):
                 raise HTTPException(status_code=404, detail="Relationship not found or not authorized")
         except Exception as e:
             raise HTTPException(status_code=500, detail="Failed to fetch relationship")
         
-        # Fetch interactions for the relationship
-        # response = supabase.table("logs").select("*").eq("relationship_id", relationship_id).execute()
+        # Fetch a page of interactions for the relationship (embeddings omitted by default)
         logDao = LogDAO()
-        response = logDao.get_by_relationship_id(relationship_id)
-
-        return response.data
+        logs_response = await logDao.get_by_relationship_id(
+            relationship_id,
+            page_size=limit,
+            after=after,
+            include_embeddings=include_embeddings
+        )
+        data, next_cursor = split_log_page(logs_response.data, limit)
+        if include_embeddings and embedding_format != "list":
+            # Compact base64 vectors instead of JSON float lists
+            for row in data:
+                if row.get("embeddings"):
+                    row["embeddings"] = encode_vector(parse_pgvector(row["embeddings"]), embedding_format)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+
+        return data
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to fetch interactions")
 
@@ -173,12 +205,6 @@ async def post_interaction(relationship_id: str, log_request: LogRequest, token:
     try:
         user_id = token["user_id"]
 
-        # Check if the relationship exists and belongs to the user
-        relationshipDao = RelationshipDAO()
-        relationship_response = relationshipDao.get_by_id(relationship_id, user_id)
-        if not relationship_response.data:
-            raise HTTPException(status_code=404, detail="Relationship not found or not authorized")
-
         # Convert the date to IST timezone
         ist = timezone("Asia/Kolkata")
         if isinstance(log_request.date, datetime):
@@ -188,23 +214,24 @@ async def post_interaction(relationship_id: str, log_request: LogRequest, token:
             date_in_ist = datetime.fromisoformat(log_request.date).astimezone(ist)
 
         # Get embeddings first
-        embeddings = get_embeddings(log_request.content)
+        embeddings = await get_embeddings_async(log_request.content)
         
         # Create the new log entry
         new_log = {
             "content": log_request.content,
             "date": date_in_ist.isoformat(),  # Ensure the date is in ISO format with IST timezone
             "relationship_id": relationship_id,
-            "embeddings": embeddings,
+            "embeddings": to_pgvector(embeddings),
             # fts will be handled by Supabase trigger/function
         }
 
-        # Insert the log into the "logs" table
+        # Insert the log into the "logs" table, checking ownership in the same round-trip
         logDao = LogDAO()
-        response = logDao.create(new_log)
+        response = await logDao.create_owned(user_id, new_log)
         if not response.data:
-            raise HTTPException(status_code=500, detail="Failed to add interaction")
+            raise HTTPException(status_code=404, detail="Relationship not found or not authorized")
 
+        await log_changes.log_saved(user_id, response.data[0], embeddings)
         return Log(**response.data[0])
 
     except Exception as e:
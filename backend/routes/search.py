@@ -1,27 +1,46 @@
 import asyncio
-from fastapi import APIRouter, HTTPException, Depends, Request
-from pydantic import BaseModel
+import heapq
+import json
+import uuid
+from uuid import UUID
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 import os
 import sys
 from dotenv import load_dotenv
 load_dotenv()
 sys.path.append(os.getenv('HOME_PATH', '.')) # Added default '.' for safety
-from services.llm import generate_response
-from services.connect_db import supabase
-from services.embeddings import get_embeddings
+from services.llm import generate_response, generate_response_stream
+from services.llm_limiter import current_llm_user
+from services.connect_db import db
+from services.embeddings import get_embeddings_async
+from services.vector_codec import to_pgvector
+from services.vector_index import vector_indexes
+from services.rank_fusion import RankedSource, fuse
+from services.search_cache import search_cache
+from dao.search_result_dao import SearchResultDAO
+from dao.log_dao import LogDAO
 from routes.auth import verify_jwt_token
 from typing import Optional, List, Dict, Any
 from abc import ABC, abstractmethod
 
-# Import run_in_threadpool for running sync blocking code efficiently
-from fastapi.concurrency import run_in_threadpool
 from core.limiter import limiter
 from starlette.requests import Request
 
 search_router = APIRouter()
 
+# Default hybrid fusion: 'rrf', 'weighted', or 'rpc' for the database-side blend
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")
+# Upper bound on how many candidates per requested result each retriever may return
+MAX_CANDIDATE_MULTIPLIER = 10
+
 
 class SearchStrategy(ABC):
+    # Key of the relevance score on each result row
+    score_key = 'semantic_score'
+    requires_embedding = True
+
     @abstractmethod
     async def execute(
         self,
@@ -33,15 +52,16 @@ class SearchStrategy(ABC):
         pass
 
 class KeywordSearchStrategy(SearchStrategy):
+    score_key = 'search_score'
+    requires_embedding = False
+
     async def execute(self, query_text, user_id, match_count, **kwargs):
         try:
-            response = await run_in_threadpool(
-                supabase.rpc('keyword_search', {
-                    'query_text': query_text,
-                    'user_id': user_id,
-                    'match_count': match_count
-                }).execute
-            )
+            response = await db.rpc('keyword_search', {
+                'query_text': query_text,
+                'user_id': user_id,
+                'match_count': match_count
+            }).execute()
             return response.data
         except Exception as e:
             print(f"[ERROR] Keyword search failed: {e}", file=sys.stderr)
@@ -52,19 +72,37 @@ class SemanticSearchStrategy(SearchStrategy):
         if query_embedding is None:
              raise ValueError("Semantic search requires query_embedding.")
         try:
-            response = await run_in_threadpool(
-                 supabase.rpc('semantic_search', {
-                    'query_embedding': query_embedding,
-                    'user_id': user_id,
-                    'match_count': match_count,
-                }).execute
-            )
+            response = await db.rpc('semantic_search', {
+                'query_embedding': to_pgvector(query_embedding),
+                'user_id': user_id,
+                'match_count': match_count,
+            }).execute()
             return response.data
         except Exception as e:
             print(f"[ERROR] Semantic search failed: {e}", file=sys.stderr)
             raise HTTPException(status_code=500, detail="Semantic search failed")
 
+class HybridFusionParams(BaseModel):
+    """
+    Client-tunable fusion knobs. A ValidationError is a ValueError, so the
+    search routes answer out-of-range values with 400.
+    """
+    rrf_k: float = Field(60, gt=0)
+    candidate_multiplier: float = Field(2, ge=1, le=MAX_CANDIDATE_MULTIPLIER)
+
 class HybridSearchStrategy(SearchStrategy):
+    """
+    Runs keyword and semantic retrieval concurrently and fuses them in-app
+    (reciprocal-rank or weighted normalized scores), so fusion can be tuned
+    per request. fusion='rpc' keeps the database-side hybrid_search blend.
+    """
+    score_key = 'hybrid_score'
+
+    def __init__(self, keyword: SearchStrategy, semantic: SearchStrategy, local_semantic: SearchStrategy):
+        self.keyword = keyword
+        self.semantic = semantic
+        self.local_semantic = local_semantic
+
     async def execute(
         self,
         query_text,
@@ -73,32 +111,77 @@ class HybridSearchStrategy(SearchStrategy):
         query_embedding,
         full_text_weight=0.6,
         semantic_weight=0.4,
+        fusion=HYBRID_FUSION,
+        rrf_k=60,
+        candidate_multiplier=2,
+        semantic_source="rpc",
         **kwargs 
     ):
         if query_embedding is None:
              raise ValueError("Hybrid search requires query_embedding.")
-        try:
-            response = await run_in_threadpool(
-                supabase.rpc('hybrid_search', {
-                    'query_text': query_text,
-                    'query_embedding': query_embedding,
-                    'user_id': user_id,
-                    'match_count': match_count,
-                    'full_text_weight': full_text_weight,
-                    'semantic_weight': semantic_weight
-                }).execute
+        tuning = HybridFusionParams(rrf_k=rrf_k, candidate_multiplier=candidate_multiplier)
+        if fusion == "rpc":
+            return await self._execute_rpc(
+                query_text, user_id, match_count, query_embedding, full_text_weight, semantic_weight
             )
+
+        semantic = self.local_semantic if semantic_source == "local" else self.semantic
+        candidate_count = max(match_count, int(match_count * tuning.candidate_multiplier))
+        keyword_results, semantic_results = await asyncio.gather(
+            self.keyword.execute(query_text, user_id, candidate_count),
+            semantic.execute(query_text, user_id, candidate_count, query_embedding=query_embedding)
+        )
+        return fuse(
+            [
+                RankedSource(keyword_results or [], self.keyword.score_key, float(full_text_weight)),
+                RankedSource(semantic_results or [], semantic.score_key, float(semantic_weight))
+            ],
+            top_k=match_count,
+            method=fusion,
+            score_key=self.score_key,
+            rrf_k=tuning.rrf_k
+        )
+
+    async def _execute_rpc(self, query_text, user_id, match_count, query_embedding, full_text_weight, semantic_weight):
+        try:
+            response = await db.rpc('hybrid_search', {
+                'query_text': query_text,
+                'query_embedding': to_pgvector(query_embedding),
+                'user_id': user_id,
+                'match_count': match_count,
+                'full_text_weight': full_text_weight,
+                'semantic_weight': semantic_weight
+            }).execute()
             return response.data
         except Exception as e:
             print(f"[ERROR] Hybrid search failed: {e}", file=sys.stderr)
             raise HTTPException(status_code=500, detail="Hybrid search failed")
 
+class LocalSemanticSearchStrategy(SearchStrategy):
+    """
+    Semantic search against the user's in-process vector index instead of the
+    semantic_search RPC. The index is built lazily on first use.
+    """
+    async def execute(self, query_text, user_id, match_count, query_embedding, **kwargs):
+        if query_embedding is None:
+             raise ValueError("Local semantic search requires query_embedding.")
+        try:
+            index = await vector_indexes.get(user_id)
+            return index.search(query_embedding, match_count)
+        except Exception as e:
+            print(f"[ERROR] Local semantic search failed: {e}", file=sys.stderr)
+            raise HTTPException(status_code=500, detail="Local semantic search failed")
+
 # --- Strategy Factory ---
 class SearchStrategyFactory:
+    _keyword = KeywordSearchStrategy()
+    _semantic = SemanticSearchStrategy()
+    _local_semantic = LocalSemanticSearchStrategy()
     _strategies = {
-        'keyword': KeywordSearchStrategy(),
-        'semantic': SemanticSearchStrategy(),
-        'hybrid': HybridSearchStrategy()
+        'keyword': _keyword,
+        'semantic': _semantic,
+        'hybrid': HybridSearchStrategy(_keyword, _semantic, _local_semantic),
+        'local_semantic': _local_semantic
     }
 
     @classmethod
@@ -115,6 +198,88 @@ class SearchRequest(BaseModel):
     match_count: int = 15
     params: Optional[Dict[str, Any]] = None
 
+SYSTEM_PROMPT = "You are a helpful assistant. Answer the user's question based on the provided interactions. Don't answer like 'based on the interactions/information', just answer the question directly."
+
+async def rank_results(search_data: SearchRequest, user_id: str, strategy: SearchStrategy) -> list:
+    """
+    Embed the query if needed, run the strategy and return the top rows.
+    """
+    # --- Handle Embeddings (CPU Bound) ---
+    query_embedding = None
+    if strategy.requires_embedding:
+        try:
+            query_embedding = await get_embeddings_async(search_data.query)
+        except Exception as e:
+            print(f"[ERROR] Failed to get embeddings: {e}", file=sys.stderr)
+            raise HTTPException(status_code=500, detail="Failed to generate query embeddings")
+
+    result_data = await strategy.execute(
+        query_text=search_data.query,
+        user_id=user_id,
+        match_count=search_data.match_count,
+        query_embedding=query_embedding,
+        **(search_data.params or {})
+    )
+
+    if not isinstance(result_data, list):
+         print(f"[WARNING] Search strategy returned non-list data: {type(result_data)}", file=sys.stderr)
+         result_data = [] 
+
+    # Top-k selection with a heap rather than sorting every row
+    return heapq.nlargest(
+        search_data.match_count,
+        result_data,
+        key=lambda r: r.get(strategy.score_key) or 0.0
+    )
+
+def build_llm_prompt(query: str, sorted_results: list) -> str:
+    context = "\n".join([f"{r.get('date', 'Unknown Date')}: {r.get('content', '')} (with {r.get('name', 'Unknown Name')})" for r in sorted_results[:5]]) # Limit to top 5 for context
+    llm_prompt = f"Instructions:\n{SYSTEM_PROMPT}\n\nContext:\n{context}\n\nQuestion: {query}"
+    print(f"[DEBUG] LLM prompt generated (length: {len(llm_prompt)})") # Avoid printing full context/prompt
+    return llm_prompt
+
+def format_results(sorted_results: list, score_key: str) -> list:
+    return [{
+        "name": r.get("name"),
+        "date": r.get("date"),
+        "content": r.get("content"),
+        "score": r.get(score_key, 0.0) # Use safe access
+    } for r in sorted_results]
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight
+_background_tasks: set = set()
+
+def persist_search(user_id: str, search_data: SearchRequest, score_key: str, sorted_results: list, llm_answer: Optional[str]) -> str:
+    """
+    Record the search as a compact SearchResult (log ids, scores, answer)
+    without delaying the response. Returns the id it will be stored under.
+    """
+    search_id = str(uuid.uuid4())
+    ranked = [(r.get("log_id") or r.get("id"), r.get(score_key) or 0.0) for r in sorted_results]
+    ranked = [(str(log_id), float(score)) for log_id, score in ranked if log_id]
+
+    async def save():
+        try:
+            await SearchResultDAO().create(
+                user_id,
+                search_data.query,
+                search_data.search_type,
+                [log_id for log_id, _ in ranked],
+                [score for _, score in ranked],
+                llm_answer,
+                search_id=search_id
+            )
+        except Exception as e:
+            print(f"[ERROR] Failed to persist search: {e}", file=sys.stderr)
+
+    task = asyncio.create_task(save())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return search_id
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 # --- Search Endpoint ---
 @search_router.post("/search")
 async def search(
@@ -129,52 +294,25 @@ async def search(
     
     try:
         user_id = token["user_id"]
+        current_llm_user.set(user_id)
         strategy = SearchStrategyFactory.get_strategy(search_data.search_type)
         strategy_params = search_data.params or {}
 
-        # --- Handle Embeddings (CPU Bound) ---
-        query_embedding = None
-        if search_data.search_type in ['semantic', 'hybrid']:
-            try:
-                query_embedding = await run_in_threadpool(get_embeddings, search_data.query)
-            except Exception as e:
-                print(f"[ERROR] Failed to get embeddings: {e}", file=sys.stderr)
-                raise HTTPException(status_code=500, detail="Failed to generate query embeddings")
-
-        result_data = await strategy.execute(
-            query_text=search_data.query,
-            user_id=user_id,
-            match_count=search_data.match_count,
-            query_embedding=query_embedding,
-            **strategy_params
-        )
+        # --- Serve repeated searches from the cache (invalidated on log writes) ---
+        cache_key = await search_cache.key(user_id, search_data.query, search_data.search_type, search_data.match_count, strategy_params)
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        if not isinstance(result_data, list):
-             print(f"[WARNING] Search strategy returned non-list data: {type(result_data)}", file=sys.stderr)
-             result_data = [] 
-             
-        score_key = 'hybrid_score' if search_data.search_type == 'hybrid' else \
-                    'search_score' if search_data.search_type == 'keyword' else \
-                    'semantic_score'
-
-        sorted_results = sorted(
-            result_data,
-            key=lambda r: r.get(score_key, 0.0),
-            reverse=True
-        )
-        sorted_results = sorted_results[:search_data.match_count]
+        sorted_results = await rank_results(search_data, user_id, strategy)
 
-        # --- Generate LLM Response (Sync Network I/O) ---
+        # --- Generate LLM Response (Async Network I/O) ---
         llm_answer = None
+        llm_failed = False
         if sorted_results:
             try:
-                system_prompt = "You are a helpful assistant. Answer the user's question based on the provided interactions. Don't answer like 'based on the interactions/information', just answer the question directly."
-                context = "\n".join([f"{r.get('date', 'Unknown Date')}: {r.get('content', '')} (with {r.get('name', 'Unknown Name')})" for r in sorted_results[:5]]) # Limit to top 5 for context
-
-                llm_prompt = f"Instructions:\n{system_prompt}\n\nContext:\n{context}\n\nQuestion: {search_data.query}"
-                print(f"[DEBUG] LLM prompt generated (length: {len(llm_prompt)})") # Avoid printing full context/prompt
-
-                llm_answer = await run_in_threadpool(generate_response, llm_prompt)
+                llm_prompt = build_llm_prompt(search_data.query, sorted_results)
+                llm_answer = await generate_response(llm_prompt)
 
             except HTTPException as e:
                  # Re-raise HTTP exceptions (like rate limiting from generate_response)
@@ -183,18 +321,18 @@ async def search(
                 # Log error but don't fail the whole search if LLM fails
                 print(f"[ERROR] Failed to generate LLM summary: {e}", file=sys.stderr)
                 llm_answer = "Error generating summary." # Indicate LLM failure
+                llm_failed = True
 
         # --- Format Final Response ---
-        return {
-            "results": [{
-                "name": r.get("name"),
-                "date": r.get("date"),
-                "content": r.get("content"),
-                "score": r.get(score_key, 0.0) # Use safe access
-            } for r in sorted_results],
+        response = {
+            "results": format_results(sorted_results, strategy.score_key),
             "llm_answer": llm_answer,
             "count": len(sorted_results)
         }
+        if not llm_failed:
+            response["search_id"] = persist_search(user_id, search_data, strategy.score_key, sorted_results, llm_answer)
+            search_cache.set(cache_key, response)
+        return response
 
     except ValueError as e: # Catch specific errors like invalid search type
         raise HTTPException(status_code=400, detail=str(e))
@@ -204,4 +342,131 @@ async def search(
     except Exception as e:
         # Catch-all for unexpected errors
         print(f"[ERROR] Unexpected error in search endpoint: {e}", file=sys.stderr)
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
+# --- Streaming Search Endpoint (Server-Sent Events) ---
+@search_router.post("/search/stream")
+async def search_stream(
+    request: Request,
+    search_data: SearchRequest,
+    token: dict = Depends(verify_jwt_token)
+):
+    """
+    Same search as POST /search, streamed as SSE: a `results` event as soon as
+    ranking finishes, `token` events as the LLM answer is generated, then
+    `done` with the full answer (or `error` if generation fails).
+    """
+    @limiter.limit("10/minute")
+    def rate_limit_search(request: Request):
+        return True
+    rate_limit_search(request)
+
+    try:
+        user_id = token["user_id"]
+        current_llm_user.set(user_id)
+        strategy = SearchStrategyFactory.get_strategy(search_data.search_type)
+        strategy_params = search_data.params or {}
+        cache_key = await search_cache.key(user_id, search_data.query, search_data.search_type, search_data.match_count, strategy_params)
+        cached = search_cache.get(cache_key)
+        sorted_results = None if cached is not None else await rank_results(search_data, user_id, strategy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"[ERROR] Unexpected error in search stream endpoint: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
+    async def events():
+        if cached is not None:
+            yield sse_event("results", {"results": cached["results"], "count": cached["count"]})
+            if cached["llm_answer"]:
+                yield sse_event("token", {"text": cached["llm_answer"]})
+            yield sse_event("done", {"llm_answer": cached["llm_answer"], "search_id": cached.get("search_id")})
+            return
+
+        results = format_results(sorted_results, strategy.score_key)
+        yield sse_event("results", {"results": results, "count": len(results)})
+
+        answer_parts = []
+        if sorted_results:
+            try:
+                async for text in generate_response_stream(build_llm_prompt(search_data.query, sorted_results)):
+                    answer_parts.append(text)
+                    yield sse_event("token", {"text": text})
+            except HTTPException as e:
+                yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+                return
+            except Exception as e:
+                print(f"[ERROR] Failed to stream LLM summary: {e}", file=sys.stderr)
+                yield sse_event("error", {"status_code": 500, "detail": "Error generating summary."})
+                return
+
+        llm_answer = "".join(answer_parts) if sorted_results else None
+        search_id = persist_search(user_id, search_data, strategy.score_key, sorted_results, llm_answer)
+        search_cache.set(cache_key, {"results": results, "llm_answer": llm_answer, "count": len(results), "search_id": search_id})
+        yield sse_event("done", {"llm_answer": llm_answer, "search_id": search_id})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- Search History ---
+@search_router.get("/search/recent")
+async def recent_searches(limit: int = Query(20, ge=1, le=100), token: dict = Depends(verify_jwt_token)):
+    """
+    The user's most recent searches (query and date only).
+    """
+    try:
+        searches = await SearchResultDAO().get_recent(token["user_id"], limit)
+        return [{
+            "search_id": search.id,
+            "query": search.query,
+            "search_type": search.search_type,
+            "search_date": search.search_date
+        } for search in searches]
+    except Exception as e:
+        print(f"[ERROR] Failed to list recent searches: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail="Failed to list recent searches")
+
+@search_router.get("/search/history/{search_id}")
+async def reopen_search(search_id: UUID, token: dict = Depends(verify_jwt_token)):
+    """
+    Re-open a past search: its stored answer plus its results, rehydrated
+    from the log ids in one query. Logs deleted since then are left out.
+    """
+    user_id = token["user_id"]
+    try:
+        search = await SearchResultDAO().get_by_id(search_id, user_id)
+    except Exception as e:
+        print(f"[ERROR] Failed to load search {search_id}: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail="Failed to load search")
+    if search is None:
+        raise HTTPException(status_code=404, detail="Search not found")
+
+    rows_by_id = {}
+    if search.log_ids:
+        logs_response = await LogDAO().get_by_ids(user_id, search.log_ids)
+        if logs_response == '':
+            raise HTTPException(status_code=500, detail="Failed to load search results")
+        rows_by_id = {str(row["log_id"]): row for row in logs_response.data or []}
+
+    scores = search.scores or [0.0] * len(search.log_ids)
+    results = [{
+        "name": rows_by_id[log_id]["relationships"]["name"],
+        "date": rows_by_id[log_id]["date"],
+        "content": rows_by_id[log_id]["content"],
+        "score": score
+    } for log_id, score in zip(map(str, search.log_ids), scores) if log_id in rows_by_id]
+
+    return {
+        "search_id": search.id,
+        "query": search.query,
+        "search_type": search.search_type,
+        "search_date": search.search_date,
+        "results": results,
+        "llm_answer": search.ai_summary,
+        "count": len(results)
+    }
@@ -9,6 +9,9 @@ sys.path.append(os.getenv('HOME_PATH'))
 
 from services.gemini import summarize_file, summarize_daily_interactions
 from services.SummarizeText import summarize_text
+from services.daily_summaries import daily_summaries
+from services.llm_limiter import current_llm_user
+from datetime import date as date_type, datetime, timezone
 from routes.auth import verify_jwt_token
 from pydantic import BaseModel
 
@@ -23,8 +26,11 @@ async def summarize_text_endpoint(
     Endpoint to summarize text using Gemini API
     """
     try:
+        current_llm_user.set(token["user_id"])
         summary = await summarize_text(text)
         return {"summary": summary}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
 
@@ -37,9 +43,12 @@ async def summarize_file_endpoint(
     Endpoint to summarize a file using Gemini API
     """
     try:
-        file_content = await file.read()
-        summary = await summarize_file(file_content, file.filename)
+        current_llm_user.set(token["user_id"])
+        # Pass the upload's file object through rather than reading it all into memory
+        summary = await summarize_file(file.file, file.filename)
         return {"summary": summary}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File summarization failed: {str(e)}")
 
@@ -65,8 +74,42 @@ async def summarize_daily_interactions_endpoint(
     Endpoint to summarize today's interactions using Gemini API
     """
     try:
+        current_llm_user.set(token["user_id"])
         # Pass the interactions list to the Gemini service
         summary = await summarize_daily_interactions(payload.interactions)
         return {"summary": summary}
+    except HTTPException as e:
+        raise e
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Daily summarization failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Daily summarization failed: {str(e)}")
+
+@summarization_router.get("/daily")
+async def get_daily_summary(
+    date: Optional[str] = None,
+    token: dict = Depends(verify_jwt_token)
+):
+    """
+    The materialized summary of the user's logs for a UTC day (YYYY-MM-DD,
+    default today). Generated on first read and whenever that day's logs
+    change; otherwise served straight from the daily_summaries table.
+    """
+    try:
+        day = date_type.fromisoformat(date) if date else datetime.now(timezone.utc).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+
+    try:
+        current_llm_user.set(token["user_id"])
+        summary = await daily_summaries.materialize(token["user_id"], day)
+        if summary is None:
+            when = "today" if day == datetime.now(timezone.utc).date() else f"on {day.isoformat()}"
+            return {"summary_date": day.isoformat(), "summary": f"No interactions recorded {when}.", "updated_at": None}
+        return {
+            "summary_date": summary.summary_date.isoformat(),
+            "summary": summary.summary_content,
+            "updated_at": (summary.updated_at or summary.created_at).isoformat()
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Daily summarization failed: {str(e)}")
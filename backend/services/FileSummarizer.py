@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
+from typing import BinaryIO
 
 class FileSummarizer(ABC):
     @abstractmethod
-    async def summarize(self, file_path: str) -> str:
+    async def summarize(self, stream: BinaryIO) -> str:
         """
-        Summarize the content of the file at the given path.
+        Summarize the content of a seekable binary file (the spooled upload).
         """
         pass
\ No newline at end of file
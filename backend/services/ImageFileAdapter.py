@@ -1,18 +1,47 @@
-from PIL import Image
-import pytesseract
+import asyncio
+import os
+from typing import BinaryIO
 from services.SummarizeText import summarize_text
 from fastapi import HTTPException
 from services.FileSummarizer import FileSummarizer
+from services.ocr import init_ocr_worker, ocr_image
+from core.executors import OCR_WORKERS, get_process_pool
+
+# Images admitted to the OCR pool at once (running + queued); beyond that we shed load
+OCR_MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", str(OCR_WORKERS * 4)))
+OCR_RETRY_AFTER_SECONDS = int(os.getenv("OCR_RETRY_AFTER_SECONDS", "5"))
+
+_ocr_slots = asyncio.Semaphore(OCR_MAX_PENDING)
+
+async def run_ocr(stream: BinaryIO) -> str:
+    """
+    OCR an image in the OCR process pool. Raises 503 instead of queueing
+    without bound when OCR_MAX_PENDING images are already in flight.
+    """
+    if _ocr_slots.locked():
+        raise HTTPException(
+            status_code=503,
+            detail="OCR is busy, try again shortly",
+            headers={"Retry-After": str(OCR_RETRY_AFTER_SECONDS)}
+        )
+    async with _ocr_slots:
+        # Workers reopen the spooled upload by path; other streams are sent as bytes
+        path = getattr(stream, "name", None)
+        source = path if isinstance(path, str) and os.path.exists(path) else await asyncio.to_thread(stream.read)
+        pool = get_process_pool("ocr", OCR_WORKERS, initializer=init_ocr_worker)
+        return await asyncio.get_running_loop().run_in_executor(pool, ocr_image, source)
+
 class ImageFileSummarizer(FileSummarizer):
-    async def summarize(self, file_path: str) -> str:
+    async def summarize(self, stream: BinaryIO) -> str:
         try:
-            image = Image.open(file_path)
-            text_content = pytesseract.image_to_string(image)
+            text_content = await run_ocr(stream)
             
             if not text_content.strip():
                 return "The image contains no recognizable text."
             
             return await summarize_text(text_content)
+        except HTTPException as e:
+            raise e
         except Exception as e:
             print(f"Error summarizing image: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to summarize image: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Failed to summarize image: {str(e)}")
@@ -1,19 +1,70 @@
-from PyPDF2 import PdfReader
+import asyncio
+import os
+from typing import BinaryIO, List
 from services.SummarizeText import summarize_text
 from fastapi import HTTPException
 from services.FileSummarizer import FileSummarizer
+from services.pdf_pages import count_pages, extract_page_range
+from core.executors import PDF_WORKERS, get_process_pool
+
+# Pages beyond PDF_MAX_PAGES are ignored; extraction stops early once
+# PDF_EARLY_STOP_CHARS characters are collected (0 disables early stop)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "500"))
+PDF_PAGE_BATCH = int(os.getenv("PDF_PAGE_BATCH", "8"))
+PDF_EARLY_STOP_CHARS = int(os.getenv("PDF_EARLY_STOP_CHARS", "0"))
+
 class PDFFileSummarizer(FileSummarizer):
-    async def summarize(self, file_path: str) -> str:
+    async def summarize(self, stream: BinaryIO) -> str:
         try:
-            reader = PdfReader(file_path)
-            text_content = ""
-            for page in reader.pages:
-                text_content += page.extract_text() or ""
-            
+            text_content = "\n".join(await self.extract_pages(stream))
+
             if not text_content.strip():
                 return "The PDF contains no extractable text."
-            
+
             return await summarize_text(text_content)
+        except HTTPException as e:
+            raise e
         except Exception as e:
             print(f"Error summarizing PDF: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to summarize PDF: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Failed to summarize PDF: {str(e)}")
+
+    async def extract_pages(self, stream: BinaryIO) -> List[str]:
+        """
+        Extract page texts in order. Documents longer than one batch are split
+        into PDF_PAGE_BATCH-page ranges extracted in parallel worker processes.
+        """
+        page_count = min(await asyncio.to_thread(count_pages, stream), PDF_MAX_PAGES)
+        path = getattr(stream, "name", None)
+        if page_count <= PDF_PAGE_BATCH or not isinstance(path, str) or not os.path.exists(path):
+            stream.seek(0)
+            return await asyncio.to_thread(extract_page_range, stream, 0, page_count)
+
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool("pdf", PDF_WORKERS)
+        batches = [
+            loop.run_in_executor(pool, extract_page_range, path, start, min(start + PDF_PAGE_BATCH, page_count))
+            for start in range(0, page_count, PDF_PAGE_BATCH)
+        ]
+
+        pages: List[str] = []
+        collected = 0
+        try:
+            # Consume batches in page order so early stop keeps a prefix of the document
+            for batch in batches:
+                for page_text in await batch:
+                    pages.append(page_text)
+                    collected += len(page_text)
+                if PDF_EARLY_STOP_CHARS and collected >= PDF_EARLY_STOP_CHARS:
+                    break
+        finally:
+            for batch in batches:
+                # Batches already finished (or that can't be stopped) may hold
+                # an exception nobody awaits; retrieve it so it isn't logged
+                batch.add_done_callback(_discard_result)
+                batch.cancel()
+        return pages
+
+
+def _discard_result(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
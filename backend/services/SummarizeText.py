@@ -1,35 +1,163 @@
+import asyncio
 import os
+import re
+import zlib
 from fastapi import HTTPException
 from dotenv import load_dotenv
 from services.FileSummarizer import FileSummarizer
 load_dotenv()
-from typing import Optional
-import google.generativeai as genai
+from typing import Iterator, List, Optional
+from services.llm_client import generate_content, DEFAULT_MODEL
+from services.llm_cache import llm_response_cache
+from services.llm_limiter import current_llm_user
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is not set")
+# Bump when the prompts below change so cached summaries are not reused
+SUMMARIZE_TEXT_TEMPLATE_VERSION = "summarize_text/v1"
+SUMMARIZE_CHUNK_TEMPLATE_VERSION = "summarize_chunk/v2"
 
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
+# Long inputs are summarized chunk by chunk (map), then the partial summaries are combined (reduce)
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+# Rough average for English text; avoids a count_tokens round trip per chunk
+CHARS_PER_TOKEN = 4
+MAX_REDUCE_DEPTH = 3
+# Once a chunk is half full, it ends after any unit whose hash is divisible by this
+CHUNK_BOUNDARY_MODULUS = 4
 
-async def summarize_text(text: str) -> str:
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_units(text: str, max_tokens: int) -> Iterator[str]:
     """
-    Use Gemini to summarize text content
+    Yield pieces of text that each fit in max_tokens, preferring paragraph,
+    then sentence, then whitespace boundaries.
     """
-    if not text or len(text.strip()) == 0:
-        return ""
-    
-    try:
-        prompt = f"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            yield paragraph
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                yield sentence[:cut]
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                yield sentence
+
+
+def _is_boundary(unit: str) -> bool:
+    return zlib.crc32(unit.encode("utf-8")) % CHUNK_BOUNDARY_MODULUS == 0
+
+
+def iter_chunks(text: str, max_tokens: int = SUMMARY_CHUNK_TOKENS) -> Iterator[str]:
+    """
+    Group text into consecutive chunks of at most ~max_tokens tokens.
+    Boundaries are chosen by content (see _is_boundary) rather than by
+    greedy packing, so after an edit they line up again within a chunk or
+    two and the chunks that follow are unchanged (and cached).
+    """
+    current: List[str] = []
+    current_tokens = 0
+    for unit in _split_units(text, max_tokens):
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            yield "\n\n".join(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+        if current_tokens >= max_tokens // 2 and _is_boundary(unit):
+            yield "\n\n".join(current)
+            current, current_tokens = [], 0
+    if current:
+        yield "\n\n".join(current)
+
+
+def _summary_prompt(text: str) -> str:
+    return f"""
         Please provide a concise summary of the following text. Focus on key points, 
         main ideas, and important details while maintaining the original meaning:
         
         {text}
         """
+
+
+def _chunk_prompt(chunk: str) -> str:
+    # No part numbers: the prompt (and cache key) depend only on the chunk's text
+    return f"""
+        The following is one part of a longer document. Summarize this part,
+        keeping key points, names, figures, decisions and action items:
+        
+        {chunk}
+        """
+
+
+def _reduce_prompt(partial_summaries: str) -> str:
+    return f"""
+        The following are summaries of consecutive parts of one document. Combine them into a
+        single concise summary of the whole document. Focus on key points, main ideas, and
+        important details, and remove repetition:
         
-        response = model.generate_content(prompt)
-        summary = response.text
+        {partial_summaries}
+        """
+
+
+async def _map_chunks(chunks: List[str]) -> List[str]:
+    """
+    Summarize chunks concurrently, at most SUMMARY_MAP_CONCURRENCY at a time,
+    preserving document order. Map calls are charged to the global LLM
+    bucket only; the user is charged once, for the final reduce call, so a
+    long document does not exhaust their bucket part way through.
+    """
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+
+    async def summarize_chunk(chunk: str) -> str:
+        # gather runs each coroutine in its own task and context copy
+        current_llm_user.set(None)
+        async with semaphore:
+            return await llm_response_cache.get_or_generate(
+                SUMMARIZE_CHUNK_TEMPLATE_VERSION,
+                DEFAULT_MODEL,
+                chunk,
+                lambda: generate_content(_chunk_prompt(chunk))
+            )
+
+    return await asyncio.gather(*(summarize_chunk(chunk) for chunk in chunks))
+
+
+async def _map_reduce(text: str, depth: int = 0) -> str:
+    chunks = list(iter_chunks(text))
+    if len(chunks) <= 1:
+        return await generate_content(_summary_prompt(text))
+
+    partials = await _map_chunks(chunks)
+    combined = "\n\n".join(f"Part {i}: {summary.strip()}" for i, summary in enumerate(partials, start=1))
+    if estimate_tokens(combined) > SUMMARY_CHUNK_TOKENS and depth < MAX_REDUCE_DEPTH:
+        # Partial summaries are still too long for one call; reduce them in another round
+        return await _map_reduce(combined, depth + 1)
+    return await generate_content(_reduce_prompt(combined))
+
+
+
+async def summarize_text(text: str) -> str:
+    """
+    Use Gemini to summarize text content.
+    Text longer than SUMMARY_CHUNK_TOKENS is summarized with map-reduce.
+    """
+    if not text or len(text.strip()) == 0:
+        return ""
+    
+    try:
+        # Re-summarizing the same text (or re-uploading the same file) is served from cache
+        summary = await llm_response_cache.get_or_generate(
+            SUMMARIZE_TEXT_TEMPLATE_VERSION, DEFAULT_MODEL, text, lambda: _map_reduce(text)
+        )
         
         # Return a default message if summary is empty
         if not summary or len(summary.strip()) == 0:
@@ -37,6 +165,9 @@ async def summarize_text(text: str) -> str:
         
         return summary
     
+    except HTTPException:
+        # e.g. 429 from the LLM rate limiter
+        raise
     except Exception as e:
         print(f"Error summarizing text with Gemini: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to summarize text: {str(e)}")
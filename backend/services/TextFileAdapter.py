@@ -2,15 +2,32 @@ from abc import ABC, abstractmethod
 from services.SummarizeText import summarize_text
 from fastapi import HTTPException
 import os
-from typing import Optional
+import asyncio
+import codecs
+from typing import BinaryIO, Optional
 from dotenv import load_dotenv
 load_dotenv()
 from services.FileSummarizer import FileSummarizer
+from services.upload_spool import UPLOAD_CHUNK_SIZE
+
+def read_text(stream: BinaryIO) -> str:
+    """
+    Decode a UTF-8 stream chunk by chunk; fails fast on the first invalid chunk.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts = []
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
 class TextFileSummarizer(FileSummarizer):
-    async def summarize(self, file_path: str) -> str:
+    async def summarize(self, stream: BinaryIO) -> str:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text_content = f.read()
+            text_content = await asyncio.to_thread(read_text, stream)
             return await summarize_text(text_content)
         except UnicodeDecodeError:
             return "This appears to be a non-text file which cannot be directly summarized."
\ No newline at end of file
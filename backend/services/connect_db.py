@@ -1,8 +1,51 @@
-from supabase import create_client
+import httpx
+from postgrest import AsyncPostgrestClient
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
\ No newline at end of file
+
+# Connection pool / timeout tuning for the PostgREST HTTP client
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_KEEPALIVE_CONNECTIONS = int(os.getenv("DB_KEEPALIVE_CONNECTIONS", str(DB_POOL_SIZE)))
+DB_KEEPALIVE_EXPIRY = float(os.getenv("DB_KEEPALIVE_EXPIRY", "30"))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "15"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """
+    Async PostgREST client whose httpx session keeps a bounded pool of
+    keep-alive connections, so concurrent requests overlap their round-trips.
+    """
+    def create_session(self, base_url, headers, *args, **kwargs):
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(DB_TIMEOUT, connect=DB_CONNECT_TIMEOUT, pool=DB_POOL_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=DB_POOL_SIZE,
+                max_keepalive_connections=DB_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=DB_KEEPALIVE_EXPIRY
+            ),
+            http2=True,
+            follow_redirects=True
+        )
+
+
+db = PooledPostgrestClient(
+    f"{SUPABASE_URL}/rest/v1",
+    headers={
+        "apiKey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}"
+    }
+)
+
+async def close_db():
+    """
+    Close pooled connections on application shutdown.
+    """
+    await db.aclose()
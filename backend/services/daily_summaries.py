@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from dao.daily_summary_dao import DailySummaryDAO
+from dao.log_dao import LogDAO
+from models.DailySummary import DailySummary
+from services.gemini import summarize_daily_interactions, DAILY_SUMMARY_TEMPLATE_VERSION
+from services.llm_limiter import current_llm_user
+
+# How often dirty days are materialized, and how long a day must go without
+# changes first (so a burst of edits costs one LLM call)
+DAILY_SUMMARY_INTERVAL = float(os.getenv("DAILY_SUMMARY_INTERVAL", "60"))
+DAILY_SUMMARY_DEBOUNCE = float(os.getenv("DAILY_SUMMARY_DEBOUNCE", "120"))
+DAILY_SUMMARY_CONCURRENCY = int(os.getenv("DAILY_SUMMARY_CONCURRENCY", "2"))
+
+
+class DailyInteraction(NamedTuple):
+    """
+    The shape summarize_daily_interactions expects, built from a log row.
+    """
+    content: str
+    date: str
+    relationName: str
+    relationCategory: str
+
+
+def log_day(value) -> Optional[date]:
+    """
+    The UTC day of a log's date (ISO string or datetime).
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def source_hash(rows: List[dict]) -> str:
+    """
+    Identify exactly what a summary was generated from: the prompt version and
+    every log's id, date, content and relationship name/category.
+    """
+    digest = hashlib.sha256(DAILY_SUMMARY_TEMPLATE_VERSION.encode("utf-8"))
+    for row in rows:
+        relationship = row.get("relationships") or {}
+        for value in (row["log_id"], row["date"], row["content"], relationship.get("name"), relationship.get("category_type")):
+            digest.update(b"\0" + str(value or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DailySummaryScheduler:
+    """
+    Materializes one DailySummary per user per UTC day. Write paths mark days
+    dirty; a background loop re-summarizes them once they settle. Reads
+    compare the stored source_hash with the day's logs, so the LLM only runs
+    when those logs actually changed.
+    """
+    def __init__(self, interval: float, debounce: float, concurrency: int):
+        self.interval = interval
+        self.debounce = debounce
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.dirty: Dict[Tuple[str, date], float] = {}
+        # Per-day lock plus the number of callers holding or awaiting it
+        self.locks: Dict[Tuple[str, date], list] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.summary_dao = DailySummaryDAO()
+        self.log_dao = LogDAO()
+
+    def mark_dirty(self, user_id: str, day: Optional[date]):
+        if day is not None:
+            self.dirty[(str(user_id), day)] = time.monotonic()
+
+    async def materialize(self, user_id: str, day: date) -> Optional[DailySummary]:
+        """
+        Return an up-to-date summary for the day, regenerating it only if
+        its logs changed. Returns None (and drops any stored summary) when
+        the day has no logs.
+        """
+        key = (str(user_id), day)
+        entry = self.locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        lock = entry[0]
+        try:
+            async with lock:
+                start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+                logs_response = await self.log_dao.get_by_user_in_range(
+                    user_id, start.isoformat(), (start + timedelta(days=1)).isoformat()
+                )
+                if logs_response == '':
+                    raise RuntimeError("Failed to load logs for daily summary")
+
+                rows = logs_response.data or []
+                existing = await self.summary_dao.get(user_id, day)
+                if not rows:
+                    if existing is not None:
+                        await self.summary_dao.delete(user_id, day)
+                    return None
+
+                current_hash = source_hash(rows)
+                if existing is not None and existing.source_hash == current_hash:
+                    return existing
+
+                interactions = [
+                    DailyInteraction(
+                        content=row["content"],
+                        date=row["date"],
+                        relationName=(row.get("relationships") or {}).get("name") or "",
+                        relationCategory=(row.get("relationships") or {}).get("category_type") or ""
+                    )
+                    for row in rows
+                ]
+                async with self.semaphore:
+                    summary = await summarize_daily_interactions(interactions)
+                return await self.summary_dao.upsert(user_id, day, summary, current_hash)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.locks[key]
+
+    async def run_due(self):
+        """
+        Materialize every dirty day that has been quiet for the debounce period.
+        """
+        now = time.monotonic()
+        due = [key for key, marked_at in self.dirty.items() if now - marked_at >= self.debounce]
+        for key in due:
+            self.dirty.pop(key, None)
+
+        async def refresh(user_id, day):
+            try:
+                current_llm_user.set(user_id)
+                await self.materialize(user_id, day)
+            except Exception as e:
+                print(f"[ERROR] Daily summary for {user_id} on {day} failed: {e}", file=sys.stderr)
+                # Retry on a later pass
+                self.mark_dirty(user_id, day)
+
+        await asyncio.gather(*(refresh(user_id, day) for user_id, day in due))
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_due()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+
+daily_summaries = DailySummaryScheduler(DAILY_SUMMARY_INTERVAL, DAILY_SUMMARY_DEBOUNCE, DAILY_SUMMARY_CONCURRENCY)
@@ -0,0 +1,88 @@
+import asyncio
+import sys
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Set, Tuple
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching front end for an embedding model.
+
+    Concurrent callers submit single texts; the batcher holds them for at most
+    max_wait_ms (or until max_batch_size texts are queued) and encodes them
+    with one call to encode_batch on the given executor, resolving a future
+    per caller.
+    """
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], list],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None
+    ):
+        self.encode_batch = encode_batch
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Strong references to in-flight batches; the loop only holds weak ones
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, text: str):
+        """
+        Queue a single text and wait for its embedding.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[ERROR] Embedding batch task failed: {task.exception()}", file=sys.stderr)
+
+    async def stop(self):
+        """
+        Flush anything still queued and wait for in-flight batches to finish.
+        """
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical texts inside one window are encoded once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        loop = asyncio.get_running_loop()
+        try:
+            vectors = await loop.run_in_executor(self.executor, self.encode_batch, unique_texts)
+        except Exception as e:
+            print(f"[ERROR] Embedding batch of {len(unique_texts)} failed: {e}", file=sys.stderr)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
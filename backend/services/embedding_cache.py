@@ -0,0 +1,184 @@
+import fcntl
+import hashlib
+import os
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+KEY_BYTES = 32  # sha256 digest
+# Rough per-entry bookkeeping cost (dict slot, bytes key, ndarray header)
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form used for cache keys: NFC unicode, collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_cache_key(text: str, model_name: str) -> bytes:
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class DiskEmbeddingTier:
+    """
+    Fixed-capacity ring of embeddings in memory-mapped files, so cached
+    vectors survive restarts. Rows are overwritten oldest-first once full.
+    Workers sharing the directory serialize through an flock on a .lock
+    file: writers hold it exclusively from claiming a row to writing its
+    key, readers hold it shared while checking a key and copying its vector.
+    """
+    def __init__(self, directory: str, model_name: str, dim: int, capacity: int):
+        os.makedirs(directory, exist_ok=True)
+        prefix = os.path.join(directory, f"{model_name.replace('/', '_')}_{dim}_{capacity}")
+        self.capacity = capacity
+        self.keys = self._open(f"{prefix}.keys", np.uint8, (capacity, KEY_BYTES))
+        self.vectors = self._open(f"{prefix}.vectors", np.float32, (capacity, dim))
+        self.cursor = self._open(f"{prefix}.cursor", np.int64, (1,))
+        self.lock_file = open(f"{prefix}.lock", "a+")
+
+        self.index: Dict[bytes, int] = {}
+        for row in np.flatnonzero(self.keys.any(axis=1)):
+            self.index[self.keys[row].tobytes()] = int(row)
+
+    @staticmethod
+    def _open(path: str, dtype, shape):
+        expected_size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        mode = "r+" if os.path.exists(path) and os.path.getsize(path) == expected_size else "w+"
+        return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self.index.get(key)
+        if row is None:
+            return None
+        with self._locked(exclusive=False):
+            # Another worker sharing the directory may have reused this row
+            if self.keys[row].tobytes() != key:
+                del self.index[key]
+                return None
+            return np.array(self.vectors[row])
+
+    def put(self, key: bytes, vector: np.ndarray):
+        with self._locked(exclusive=True):
+            row = self.index.get(key)
+            if row is not None and self.keys[row].tobytes() != key:
+                # Reused by another worker since we stored it
+                row = None
+            if row is None:
+                row = int(self.cursor[0]) % self.capacity
+                self.cursor[0] = (row + 1) % self.capacity
+                self.index.pop(self.keys[row].tobytes(), None)
+            # Clear the key first so a crash mid-write never pairs it with a half-written vector
+            self.keys[row] = 0
+            self.vectors[row] = vector
+            self.keys[row] = np.frombuffer(key, dtype=np.uint8)
+            self.index[key] = row
+
+    def flush(self):
+        self.keys.flush()
+        self.vectors.flush()
+        self.cursor.flush()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe embedding cache keyed by sha256(model name + normalized text).
+    An in-memory LRU bounded by bytes sits in front of an optional disk tier.
+    """
+    def __init__(
+        self,
+        model_name: str,
+        dim: int,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        disk_capacity: int = 100_000
+    ):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+        self.memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.disk = None
+        if disk_dir:
+            try:
+                self.disk = DiskEmbeddingTier(disk_dir, model_name, dim, disk_capacity)
+            except OSError as e:
+                print(f"[ERROR] Embedding disk cache disabled: {e}", file=sys.stderr)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = make_cache_key(text, self.model_name)
+        with self.lock:
+            vector = self.memory.get(key)
+            if vector is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self.disk is not None:
+                vector = self.disk.get(key)
+                if vector is not None:
+                    vector.setflags(write=False)
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vector) -> np.ndarray:
+        key = make_cache_key(text, self.model_name)
+        vector = np.array(vector, dtype=np.float32)
+        # Cached arrays are handed to many callers, so they must not be mutated
+        vector.setflags(write=False)
+        with self.lock:
+            self._remember(key, vector)
+            if self.disk is not None:
+                self.disk.put(key, vector)
+        return vector
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return
+        self.memory[key] = vector
+        self.current_bytes += vector.nbytes + ENTRY_OVERHEAD_BYTES
+        while self.current_bytes > self.max_bytes and self.memory:
+            _, evicted = self.memory.popitem(last=False)
+            self.current_bytes -= evicted.nbytes + ENTRY_OVERHEAD_BYTES
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self.memory),
+                "bytes": self.current_bytes,
+                "disk_entries": len(self.disk.index) if self.disk is not None else 0
+            }
+
+    def flush(self):
+        with self.lock:
+            if self.disk is not None:
+                self.disk.flush()
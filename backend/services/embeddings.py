@@ -1,18 +1,95 @@
 from sentence_transformers import SentenceTransformer
 import numpy as np
+import os
+import torch
 from typing import List
+from core.executors import inference_executor, run_inference, INFERENCE_TORCH_THREADS
+from services.embedding_batcher import EmbeddingBatcher
+from services.embedding_cache import EmbeddingCache
 
-model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
+MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384
+
+torch.set_num_threads(INFERENCE_TORCH_THREADS)
+model = SentenceTransformer(MODEL_NAME, device='cpu')
+
+# Identical texts (repeated queries, unchanged PATCH content, retries) skip the model
+embedding_cache = EmbeddingCache(
+    MODEL_NAME,
+    EMBEDDING_DIM,
+    max_bytes=int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    disk_dir=os.getenv("EMBEDDING_CACHE_DIR") or None,
+    disk_capacity=int(os.getenv("EMBEDDING_CACHE_DISK_CAPACITY", "100000"))
+)
+
+def _encode_and_cache(texts: List[str]) -> np.ndarray:
+    """
+    Encode texts with a single forward pass and store the results in the cache.
+    Returns a (len(texts), 384) float32 array.
+    """
+    vectors = model.encode(
+        texts,
+        batch_size=max(1, len(texts)),
+        normalize_embeddings=True,
+        convert_to_numpy=True
+    )
+    vectors = np.asarray(vectors, dtype=np.float32)
 
-def get_embeddings(text) -> List[float]:
-    query_embedding = model.encode(text, normalize_embeddings=True)
-    # Convert to numpy array if not already
-    if not isinstance(query_embedding, np.ndarray):
-        query_embedding = np.array(query_embedding)
-    
     # Ensure we have exactly 384 dimensions
-    if len(query_embedding) != 384:
-        raise ValueError(f"Expected embedding dimension of 384, got {len(query_embedding)}")
-    
-    # Convert numpy floats to Python floats
-    return [float(x) for x in query_embedding.tolist()]
\ No newline at end of file
+    if vectors.ndim != 2 or vectors.shape[1] != EMBEDDING_DIM:
+        raise ValueError(f"Expected embedding dimension of {EMBEDDING_DIM}, got {vectors.shape[-1]}")
+
+    for text, vector in zip(texts, vectors):
+        embedding_cache.put(text, vector)
+
+    return vectors
+
+def get_embeddings_batch(texts: List[str]) -> List[np.ndarray]:
+    """
+    Embed several texts, encoding only the ones missing from the cache.
+    """
+    results: List[np.ndarray] = [None] * len(texts)
+    missing = []
+    for i, text in enumerate(texts):
+        cached = embedding_cache.get(text)
+        if cached is not None:
+            results[i] = cached
+        else:
+            missing.append(i)
+
+    if missing:
+        encoded = _encode_and_cache([texts[i] for i in missing])
+        for i, vector in zip(missing, encoded):
+            results[i] = vector
+    return results
+
+def get_embeddings(text) -> np.ndarray:
+    """
+    Blocking single-text encode; async code should use get_embeddings_async.
+    """
+    return get_embeddings_batch([text])[0]
+
+# Concurrent async callers share forward passes through the batcher,
+# which encodes on the dedicated inference executor
+embedding_batcher = EmbeddingBatcher(
+    _encode_and_cache,
+    max_batch_size=int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5")),
+    executor=inference_executor
+)
+
+async def get_embeddings_async(text: str) -> np.ndarray:
+    """
+    Embed a single text from async code, batched with concurrent requests.
+    Cache hits return immediately without queueing.
+    """
+    cached = embedding_cache.get(text)
+    if cached is not None:
+        return cached
+    return await embedding_batcher.submit(text)
+
+async def get_embeddings_batch_async(texts: List[str]) -> List[np.ndarray]:
+    """
+    Embed an already-collected list of texts on the inference executor.
+    """
+    return await run_inference(get_embeddings_batch, texts)
@@ -1,18 +1,9 @@
-import os
 from typing import List, Optional
 from pydantic import BaseModel
-import google.generativeai as genai
 from fastapi import HTTPException
 import json
 from datetime import datetime
-
-# Initialize Gemini API with your API key
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is not set")
-
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
+from services.llm_client import generate_content
 
 class EventDetails(BaseModel):
     title: str
@@ -90,11 +81,11 @@ async def extract_events_from_interaction(text: str, relation_info: dict) -> Lis
     try:
         prompt = f"{system_prompt}\n\nText to analyze:\n{text}"
         print("[DEBUG] Processing text with date context")
-        response = model.generate_content(prompt)
-        print(f"[DEBUG] Raw Gemini response: {response.text}")
+        response_text = await generate_content(prompt)
+        print(f"[DEBUG] Raw Gemini response: {response_text}")
         
         # Clean the response text
-        cleaned_response = response.text.strip()
+        cleaned_response = response_text.strip()
         cleaned_response = cleaned_response.replace('```json', '').replace('```', '').strip()
         print(f"[DEBUG] Cleaned response: {cleaned_response}")
         
@@ -124,6 +115,8 @@ async def extract_events_from_interaction(text: str, relation_info: dict) -> Lis
         
         return events
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[DEBUG] Fatal error in event extraction: {str(e)}")
         print(f"[DEBUG] Error type: {type(e)}")
@@ -1,41 +1,39 @@
+import asyncio
 import os
-import tempfile
-from typing import Optional
-from fastapi import HTTPException
-import google.generativeai as genai
+from typing import BinaryIO, Optional
 from services.FileSummarizerFactory import FileSummarizerFactory    
+from services.llm_client import generate_content
+from services.llm_cache import llm_response_cache
+from services.upload_spool import spool_upload
 
-# Initialize Gemini API with your API key
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is not set")
+DAILY_SUMMARY_MODEL = "gemini-1.5-pro"
+# Bump when the daily summary prompt changes so cached summaries are not reused
+DAILY_SUMMARY_TEMPLATE_VERSION = "daily_summary/v1"
 
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash')
 
-
-async def summarize_file(file_content: bytes, file_name: Optional[str] = None) -> str:
+async def summarize_file(file: BinaryIO, file_name: Optional[str] = None) -> str:
     """
     Use Gemini to summarize file content
     Supports text files, PDFs, and images (via OCR)
+    The upload is spooled to disk in chunks; adapters read from that stream.
     """
-    if not file_content:
-        return ""
-    
+    spooled = await asyncio.to_thread(spool_upload, file, file_name)
     try:
-        # Create a temporary file to store the content
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file_name}" if file_name else "") as temp_file:
-            temp_file.write(file_content)
-            temp_file_path = temp_file.name
-        
-        # Get the appropriate summarizer using the factory
-        summarizer = FileSummarizerFactory.get_summarizer(file_name)
-        return await summarizer.summarize(temp_file_path)
-    
+        return await summarize_spooled_file(spooled, file_name)
     finally:
-        # Clean up the temporary file
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+        # Closing the spooled file removes it
+        spooled.close()
+
+async def summarize_spooled_file(spooled: BinaryIO, file_name: Optional[str] = None) -> str:
+    """
+    Summarize an upload already spooled with spool_upload. The caller closes it.
+    """
+    if os.fstat(spooled.fileno()).st_size == 0:
+        return ""
+
+    # Get the appropriate summarizer using the factory
+    summarizer = FileSummarizerFactory.get_summarizer(file_name)
+    return await summarizer.summarize(spooled)
 
 async def summarize_daily_interactions(interactions):
     """
@@ -68,9 +66,12 @@ async def summarize_daily_interactions(interactions):
         """
         
         # Call Gemini API to generate summary
-        model = genai.GenerativeModel("gemini-1.5-pro")
-        response = await model.generate_content_async(prompt)
-        summary = response.text
+        summary = await llm_response_cache.get_or_generate(
+            DAILY_SUMMARY_TEMPLATE_VERSION,
+            DAILY_SUMMARY_MODEL,
+            all_interactions_text,
+            lambda: generate_content(prompt, model_name=DAILY_SUMMARY_MODEL)
+        )
         
         return summary
     except Exception as e:
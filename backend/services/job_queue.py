@@ -0,0 +1,312 @@
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from core.sqlite_limits_storage import connect_sqlite
+from services.llm_limiter import current_llm_user
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.db")
+# Uploads waiting for a job are kept here until the job finishes
+JOB_FILES_DIR = os.getenv("JOB_FILES_DIR", "job_files")
+# Finished jobs older than this are deleted
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# Idle workers look for jobs queued by other processes this often
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# Each process heartbeats; a process silent for JOB_OWNER_TIMEOUT is presumed
+# dead and the jobs it was running are failed
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5"))
+JOB_OWNER_TIMEOUT = float(os.getenv("JOB_OWNER_TIMEOUT", "30"))
+
+JOB_COLUMNS = {"payload": "TEXT", "input_path": "TEXT", "owner": "TEXT"}
+
+
+def remove_input(path: Optional[str]):
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class JobStore:
+    """
+    Jobs, their JSON inputs and their results in a SQLite file shared by
+    every worker process on the host. Any process may claim a queued job;
+    a claimed job records its owner so only jobs of dead owners are failed.
+    """
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, job_type TEXT NOT NULL,"
+            " status TEXT NOT NULL, result TEXT, error TEXT,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL,"
+            " payload TEXT, input_path TEXT, owner TEXT)"
+        )
+        # Databases created before payloads were persisted
+        existing = {row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in JOB_COLUMNS.items():
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (job_type, status, created_at)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS job_owners (owner TEXT PRIMARY KEY, heartbeat_at REAL NOT NULL)"
+        )
+
+    def _transaction(self, fn):
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(cursor, time.time())
+                cursor.execute("COMMIT")
+                return result
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def create(self, job_id: str, user_id: str, job_type: str, payload: dict, input_path: Optional[str] = None):
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO jobs (job_id, user_id, job_type, status, created_at, payload, input_path)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_id, job_type, JOB_QUEUED, time.time(), json.dumps(payload), input_path)
+            )
+
+    def count_queued(self, job_type: str) -> int:
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE job_type = ? AND status = ?", (job_type, JOB_QUEUED)
+            ).fetchone()[0]
+
+    def claim(self, job_type: str, owner: str) -> Optional[Tuple[str, str, dict, Optional[str]]]:
+        """
+        Atomically take the oldest queued job of a type for this owner.
+        Returns (job_id, user_id, payload, input_path), or None.
+        """
+        def claim_in(cursor, now):
+            row = cursor.execute(
+                "SELECT job_id, user_id, payload, input_path FROM jobs"
+                " WHERE job_type = ? AND status = ? ORDER BY created_at LIMIT 1",
+                (job_type, JOB_QUEUED)
+            ).fetchone()
+            if row is None:
+                return None
+            cursor.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner = ? WHERE job_id = ?",
+                (JOB_RUNNING, now, owner, row[0])
+            )
+            return row[0], row[1], json.loads(row[2] or "{}"), row[3]
+        return self._transaction(claim_in)
+
+    def mark_finished(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, payload = NULL WHERE job_id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            cursor = self.connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            job = dict(zip([column[0] for column in cursor.description], row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def heartbeat(self, owner: str):
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO job_owners (owner, heartbeat_at) VALUES (?, ?)"
+                " ON CONFLICT(owner) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (owner, time.time())
+            )
+
+    def fail_owned(self, owner: str, error: str) -> List[Optional[str]]:
+        """
+        Fail the jobs an owner is running (it is shutting down) and forget
+        the owner. Returns their input paths for removal.
+        """
+        def fail_in(cursor, now):
+            paths = [row[0] for row in cursor.execute(
+                "SELECT input_path FROM jobs WHERE status = ? AND owner = ?", (JOB_RUNNING, owner)
+            )]
+            cursor.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, payload = NULL"
+                " WHERE status = ? AND owner = ?",
+                (JOB_FAILED, error, now, JOB_RUNNING, owner)
+            )
+            cursor.execute("DELETE FROM job_owners WHERE owner = ?", (owner,))
+            return paths
+        return self._transaction(fail_in)
+
+    def recover(self, owner_timeout: float) -> List[Optional[str]]:
+        """
+        Fail running jobs whose owner stopped heartbeating (their process
+        died mid-job), and delete expired finished jobs and dead owners.
+        Queued jobs are left for any live worker to claim. Returns the
+        input paths of the failed jobs for removal.
+        """
+        def recover_in(cursor, now):
+            cursor.execute("DELETE FROM job_owners WHERE heartbeat_at < ?", (now - owner_timeout,))
+            dead = "status = ? AND (owner IS NULL OR owner NOT IN (SELECT owner FROM job_owners))"
+            paths = [row[0] for row in cursor.execute(f"SELECT input_path FROM jobs WHERE {dead}", (JOB_RUNNING,))]
+            cursor.execute(
+                f"UPDATE jobs SET status = ?, error = ?, finished_at = ?, payload = NULL WHERE {dead}",
+                (JOB_FAILED, "Interrupted: the worker running it stopped", now, JOB_RUNNING)
+            )
+            cursor.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (now - JOB_RETENTION_SECONDS,)
+            )
+            return paths
+        return self._transaction(recover_in)
+
+
+JobHandler = Callable[..., Awaitable[Any]]
+
+
+class JobQueue:
+    """
+    Durable async job queue backed by a JobStore. Each job type has its own
+    handler, queue bound and fixed number of worker tasks per process, so a
+    burst of one kind of job can't starve the others. Job inputs must be
+    JSON-serializable (files are passed by input_path); handlers return
+    JSON-serializable results. Jobs still queued when a process stops are
+    picked up by the next live worker.
+    """
+    def __init__(self, store: JobStore):
+        self.store = store
+        # Identifies this process's claims; unique per boot
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self.concurrency: Dict[str, int] = {}
+        self.max_queued: Dict[str, int] = {}
+        self.wakeups: Dict[str, asyncio.Event] = {}
+        self.workers: List[asyncio.Task] = []
+        self.heartbeat_task: Optional[asyncio.Task] = None
+
+    def register(self, job_type: str, handler: JobHandler, concurrency: int = 1, max_queued: int = 100):
+        self.handlers[job_type] = handler
+        self.concurrency[job_type] = concurrency
+        self.max_queued[job_type] = max_queued
+
+    async def _recover(self):
+        failed = await asyncio.to_thread(self.store.recover, JOB_OWNER_TIMEOUT)
+        for path in failed:
+            remove_input(path)
+        if failed:
+            print(f"[DEBUG] Marked {len(failed)} jobs of stopped workers as failed", file=sys.stderr)
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.owner)
+                await self._recover()
+            except Exception as e:
+                print(f"[ERROR] Job heartbeat failed: {e}", file=sys.stderr)
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+
+    async def start(self):
+        os.makedirs(JOB_FILES_DIR, exist_ok=True)
+        await asyncio.to_thread(self.store.heartbeat, self.owner)
+        await self._recover()
+        self.heartbeat_task = asyncio.create_task(self._heartbeat())
+        for job_type, concurrency in self.concurrency.items():
+            self.wakeups[job_type] = asyncio.Event()
+            for _ in range(concurrency):
+                self.workers.append(asyncio.create_task(self._work(job_type)))
+
+    async def stop(self):
+        tasks = self.workers + ([self.heartbeat_task] if self.heartbeat_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers.clear()
+        self.heartbeat_task = None
+        # Jobs cut off mid-run can't be resumed; queued ones stay queued
+        for path in await asyncio.to_thread(self.store.fail_owned, self.owner, "Interrupted by server shutdown"):
+            remove_input(path)
+
+    async def submit(self, user_id: str, job_type: str, input_path: Optional[str] = None, **kwargs) -> str:
+        """
+        Queue a job and return its id immediately. input_path (e.g. a spooled
+        upload under JOB_FILES_DIR) is handed to the handler and deleted once
+        the job finishes or is rejected.
+        """
+        if job_type not in self.handlers:
+            remove_input(input_path)
+            raise ValueError(f"Unknown job type: {job_type}")
+        if await asyncio.to_thread(self.store.count_queued, job_type) >= self.max_queued[job_type]:
+            remove_input(input_path)
+            raise HTTPException(status_code=503, detail="Too many pending jobs, try again shortly")
+
+        job_id = str(uuid.uuid4())
+        try:
+            await asyncio.to_thread(self.store.create, job_id, user_id, job_type, kwargs, input_path)
+        except Exception:
+            remove_input(input_path)
+            raise
+        wakeup = self.wakeups.get(job_type)
+        if wakeup is not None:
+            wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _next_job(self, job_type: str):
+        wakeup = self.wakeups[job_type]
+        while True:
+            job = await asyncio.to_thread(self.store.claim, job_type, self.owner)
+            if job is not None:
+                return job
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self, job_type: str):
+        handler = self.handlers[job_type]
+        while True:
+            job_id, user_id, kwargs, input_path = await self._next_job(job_type)
+            try:
+                # Charge the job's LLM calls to the user who submitted it
+                current_llm_user.set(user_id)
+                if input_path:
+                    kwargs["input_path"] = input_path
+                result = await handler(**kwargs)
+                await asyncio.to_thread(self.store.mark_finished, job_id, JOB_SUCCEEDED, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e.detail if isinstance(e, HTTPException) else str(e)
+                print(f"[ERROR] Job {job_id} ({job_type}) failed: {error}", file=sys.stderr)
+                try:
+                    await asyncio.to_thread(self.store.mark_finished, job_id, JOB_FAILED, None, str(error))
+                except Exception as store_error:
+                    print(f"[ERROR] Failed to record job {job_id} failure: {store_error}", file=sys.stderr)
+            # Not reached on cancellation: stop() fails the job and removes its input
+            remove_input(input_path)
+
+
+job_queue = JobQueue(JobStore(JOB_DB_PATH))
@@ -1,60 +1,28 @@
-import os
-import threading
-import time
 from fastapi import HTTPException
-import google.generativeai as genai
+from services.llm_client import generate_content, stream_content
 
-class TokenBucketLimiter:
+
+async def generate_response(prompt: str) -> str:
     """
-    A thread‑safe token‑bucket rate limiter decorator.
-    Allows up to max_calls per period (in seconds).
+    Calls Gemini without blocking the event loop and returns text.
+    The LLM rate limit is applied in llm_client; its 429s pass through.
     """
-    def __init__(self, max_calls: int, period: float):
-        self.max_calls = max_calls
-        self.period = period
-        self.lock = threading.Lock()
-        self.calls: list[float] = []
-
-    def __call__(self, fn):
-        def wrapper(*args, **kwargs):
-            now = time.time()
-            window_start = now - self.period
-
-            with self.lock:
-                # drop timestamps outside the window
-                self.calls = [t for t in self.calls if t > window_start]
-
-                if len(self.calls) >= self.max_calls:
-                    raise HTTPException(
-                        status_code=429,
-                        detail=f"LLM rate limit exceeded ({self.max_calls}/{self.period}s)"
-                    )
-
-                # record this call
-                self.calls.append(now)
-
-            return fn(*args, **kwargs)
-
-        # copy metadata
-        wrapper.__name__ = fn.__name__
-        wrapper.__doc__ = fn.__doc__
-        return wrapper
-
-
-# configure the Gemini client once
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-_model = genai.GenerativeModel("gemini-2.0-flash")
+    try:
+        return await generate_content(prompt)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"LLM error: {e}")
 
 
-@TokenBucketLimiter(max_calls=3, period=10.0)
-def generate_response(prompt: str) -> str:
+async def generate_response_stream(prompt: str):
     """
-    Synchronously calls Gemini and returns text.
-    If we exceed 5 calls/sec we automatically 429.
+    Streams Gemini's answer, yielding text chunks as they arrive.
     """
     try:
-        # blocking call
-        resp = _model.generate_content(prompt)
-        return resp.text
+        async for text in stream_content(prompt):
+            yield text
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LLM error: {e}")
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import os
+import sys
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from core.sqlite_limits_storage import connect_sqlite
+
+
+def make_response_key(template_version: str, model_name: str, input_text: str) -> str:
+    return hashlib.sha256(f"{template_version}\0{model_name}\0{input_text}".encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM responses in a SQLite file, keyed by
+    sha256(prompt template version + model + input). Entries expire after
+    ttl seconds; least recently used entries are evicted past max_bytes.
+    Bump a template's version string whenever its prompt changes.
+    """
+    def __init__(self, path: str, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS llm_responses_last_access ON llm_responses (last_access)"
+        )
+        # Concurrent requests for the same key share one LLM call
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now - self.ttl:
+                self.misses += 1
+                return None
+            self.connection.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, response: str):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, response, size, created_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, response, size, now, now)
+                )
+                cursor.execute("DELETE FROM llm_responses WHERE created_at <= ?", (now - self.ttl,))
+                self._evict(cursor)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def _evict(self, cursor):
+        total = cursor.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        while total > self.max_bytes:
+            row = cursor.execute(
+                "SELECT key, size FROM llm_responses ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            cursor.execute("DELETE FROM llm_responses WHERE key = ?", (row[0],))
+            total -= row[1]
+
+    async def get_or_generate(
+        self,
+        template_version: str,
+        model_name: str,
+        input_text: str,
+        generate: Callable[[], Awaitable[str]]
+    ) -> str:
+        """
+        Return the cached response for this input, or await generate() and
+        cache its (non-empty) result. Cache errors never fail the request.
+        """
+        key = make_response_key(template_version, model_name, input_text)
+        try:
+            cached = await asyncio.to_thread(self.get, key)
+        except Exception as e:
+            print(f"[ERROR] LLM cache read failed: {e}", file=sys.stderr)
+            cached = None
+        if cached is not None:
+            return cached
+
+        task = self.in_flight.get(key)
+        if task is None:
+            # A detached task, so one caller cancelling (e.g. a client
+            # disconnect) doesn't cancel the call the others are waiting on
+            task = asyncio.create_task(self._generate_and_store(key, generate))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    async def _generate_and_store(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        response = await generate()
+        if response:
+            try:
+                await asyncio.to_thread(self.set, key, response)
+            except Exception as e:
+                print(f"[ERROR] LLM cache write failed: {e}", file=sys.stderr)
+        return response
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        # Retrieve the exception so it isn't reported as never retrieved when every caller gave up
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries, total = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total
+        }
+
+
+llm_response_cache = LLMResponseCache(
+    os.getenv("LLM_CACHE_PATH", "llm_cache.db"),
+    ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+)
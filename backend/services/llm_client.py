@@ -0,0 +1,122 @@
+import asyncio
+import os
+import random
+import sys
+from typing import AsyncIterator, Dict
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from dotenv import load_dotenv
+load_dotenv()
+
+from services.llm_limiter import llm_limiter
+
+# Single place the Gemini SDK is configured; every LLM call site goes through
+# here, so this is also where the rate limit is applied
+API_KEY = os.getenv("GEMINI_API_KEY")
+if not API_KEY:
+    raise ValueError("GEMINI_API_KEY environment variable is not set")
+
+genai.configure(api_key=API_KEY)
+
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# Longest gap allowed between two chunks of a streamed completion
+LLM_STREAM_CHUNK_TIMEOUT = float(os.getenv("LLM_STREAM_CHUNK_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+TRANSIENT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    asyncio.TimeoutError,
+    ConnectionError
+)
+
+# Models are cached so the SDK's underlying async transport is reused across calls
+_models: Dict[str, genai.GenerativeModel] = {}
+_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+def get_model(model_name: str = DEFAULT_MODEL) -> genai.GenerativeModel:
+    model = _models.get(model_name)
+    if model is None:
+        model = _models[model_name] = genai.GenerativeModel(model_name)
+    return model
+
+
+def _backoff_delay(attempt: int) -> float:
+    # Full jitter: uniform over [0, min(max, base * 2^attempt)]
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+async def generate_content(prompt: str, model_name: str = DEFAULT_MODEL) -> str:
+    """
+    Generate a completion without blocking the event loop. Every call is
+    charged to the LLM rate limiter first (429 if the queue is too long).
+    Transient failures are retried with jittered exponential backoff, each
+    retry taking another global token; at most LLM_MAX_CONCURRENCY calls
+    are in flight per process.
+    """
+    model = get_model(model_name)
+    await llm_limiter.acquire_async()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with _semaphore:
+                response = await asyncio.wait_for(model.generate_content_async(prompt), timeout=LLM_TIMEOUT)
+            return response.text
+        except TRANSIENT_ERRORS as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"[WARNING] Transient LLM error ({type(e).__name__}), retrying in {delay:.2f}s", file=sys.stderr)
+            await asyncio.sleep(delay)
+            # A retry is another request to the provider; charge the global bucket again
+            await llm_limiter.acquire_async(charge_user=False)
+
+
+async def stream_content(prompt: str, model_name: str = DEFAULT_MODEL) -> AsyncIterator[str]:
+    """
+    Stream a completion as text chunks. Charged to the rate limiter and
+    retried on open like generate_content; failures after the first chunk propagate to the caller.
+    A concurrency slot is held only while waiting on the model, not while
+    the caller consumes a chunk or during backoff, and each chunk must
+    arrive within LLM_STREAM_CHUNK_TIMEOUT.
+    """
+    model = get_model(model_name)
+    await llm_limiter.acquire_async()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with _semaphore:
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, stream=True), timeout=LLM_TIMEOUT
+                )
+            break
+        except TRANSIENT_ERRORS as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"[WARNING] Transient LLM error ({type(e).__name__}), retrying in {delay:.2f}s", file=sys.stderr)
+            await asyncio.sleep(delay)
+            # A retry is another request to the provider; charge the global bucket again
+            await llm_limiter.acquire_async(charge_user=False)
+
+    chunks = response.__aiter__()
+    while True:
+        try:
+            async with _semaphore:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=LLM_STREAM_CHUNK_TIMEOUT)
+        except StopAsyncIteration:
+            return
+        try:
+            text = chunk.text
+        except ValueError:
+            # e.g. a trailing chunk that only carries finish metadata
+            continue
+        if text:
+            yield text
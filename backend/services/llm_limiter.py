@@ -0,0 +1,133 @@
+import asyncio
+import math
+import os
+import threading
+from contextvars import ContextVar
+from typing import List, Optional
+from fastapi import HTTPException
+from core.bucket_store import BucketSpec, BucketStore, MemoryBucketStore, create_bucket_store
+from core.limiter import RATE_LIMIT_STORAGE_URI
+
+class TokenBucketLimiter:
+    """
+    Thread-safe LLM rate limiter with one global bucket and one bucket per
+    user. A caller reserves a token from both and waits until it is due;
+    only callers that would wait longer than max_queue_seconds get a 429.
+    Balances live in a BucketStore so workers can share them.
+    """
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: float,
+        user_rate: float,
+        user_burst: float,
+        max_queue_seconds: float = 10.0,
+        store: Optional[BucketStore] = None
+    ):
+        self.global_bucket = BucketSpec("llm:global", global_rate, global_burst)
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_queue_seconds = max_queue_seconds
+        self.store = store or MemoryBucketStore()
+        self.lock = threading.Lock()
+
+        self.queued = 0
+        self.max_queued = 0
+        self.granted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    def _buckets(self, user_id: Optional[str]) -> List[BucketSpec]:
+        buckets = [self.global_bucket]
+        if user_id is not None:
+            buckets.append(BucketSpec(f"llm:user:{user_id}", self.user_rate, self.user_burst))
+        return buckets
+
+    def reserve(self, user_id: Optional[str] = None) -> float:
+        """
+        Take a token from the global bucket (and the user's, if known) and
+        return how long the caller must wait before using it. Raises 429
+        without taking anything if that wait exceeds max_queue_seconds.
+        """
+        granted, delay = self.store.reserve(self._buckets(user_id), self.max_queue_seconds)
+        with self.lock:
+            if not granted:
+                self.rejected += 1
+            else:
+                self.granted += 1
+                self.total_wait += delay
+        if not granted:
+            raise HTTPException(
+                status_code=429,
+                detail="LLM rate limit exceeded, try again later",
+                headers={"Retry-After": str(math.ceil(delay))}
+            )
+        return delay
+
+    def release(self, user_id: Optional[str] = None):
+        """
+        Hand back a reserved token whose caller gave up before using it.
+        """
+        self.store.release(self._buckets(user_id))
+
+    def _enter_queue(self):
+        with self.lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+    def _leave_queue(self):
+        with self.lock:
+            self.queued -= 1
+
+    async def acquire_async(self, user_id: Optional[str] = None, charge_user: bool = True):
+        """
+        Wait (without blocking the event loop) until a token is due.
+        Defaults to the user recorded in current_llm_user; with
+        charge_user=False only the global bucket is charged.
+        """
+        if not charge_user:
+            user_id = None
+        elif user_id is None:
+            user_id = current_llm_user.get()
+        if isinstance(self.store, MemoryBucketStore):
+            delay = self.reserve(user_id)
+        else:
+            # Shared stores do file or network I/O
+            delay = await asyncio.to_thread(self.reserve, user_id)
+        if delay <= 0:
+            return
+        self._enter_queue()
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # Client went away while queued; let the next caller have the slot
+            await asyncio.to_thread(self.release, user_id)
+            raise
+        finally:
+            self._leave_queue()
+
+    def metrics(self) -> dict:
+        global_tokens = self.store.tokens(self.global_bucket)
+        with self.lock:
+            return {
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "granted": self.granted,
+                "rejected": self.rejected,
+                "avg_wait_seconds": self.total_wait / self.granted if self.granted else 0.0,
+                "global_tokens": global_tokens
+            }
+
+
+# Set by routes and background workers so LLM calls are charged to the requesting user
+current_llm_user: ContextVar[Optional[str]] = ContextVar("current_llm_user", default=None)
+
+llm_limiter = TokenBucketLimiter(
+    global_rate=float(os.getenv("LLM_GLOBAL_RATE", "1.0")),
+    global_burst=float(os.getenv("LLM_GLOBAL_BURST", "5")),
+    user_rate=float(os.getenv("LLM_USER_RATE", "0.2")),
+    user_burst=float(os.getenv("LLM_USER_BURST", "3")),
+    max_queue_seconds=float(os.getenv("LLM_MAX_QUEUE_SECONDS", "10")),
+    # Share LLM quota across uvicorn workers; defaults to the slowapi storage
+    store=create_bucket_store(os.getenv("LLM_LIMITER_STORAGE_URI") or RATE_LIMIT_STORAGE_URI)
+)
@@ -0,0 +1,67 @@
+# Single place the write paths report log/relationship changes, so every
+# derived per-user structure (vector index, search cache, daily summaries)
+# stays consistent.
+from services.search_cache import search_cache
+from services.vector_index import vector_indexes
+from services.daily_summaries import daily_summaries, log_day
+
+
+async def _bump(user_id: str, index):
+    """
+    Move the user's generation on after a write; index is the loaded vector
+    index the write was applied to, if any, which then stays current.
+    """
+    bumped = await search_cache.invalidate_user(user_id)
+    vector_indexes.advance(user_id, index, bumped)
+
+
+async def log_saved(user_id: str, row: dict, vector, previous_date=None):
+    """
+    A log was created or updated. previous_date is the log's date before an
+    update, so the day it moved away from is re-summarized too.
+    """
+    index = vector_indexes.upsert(user_id, row, vector)
+    await _bump(user_id, index)
+    daily_summaries.mark_dirty(user_id, log_day(row.get("date")))
+    if previous_date is not None:
+        daily_summaries.mark_dirty(user_id, log_day(previous_date))
+
+
+async def logs_saved(user_id: str, saved):
+    """
+    A batch of logs was created (bulk import); saved is a list of
+    (row, vector). Derived structures are invalidated once per batch and
+    each affected day is marked once.
+    """
+    if not saved:
+        return
+    index = vector_indexes.upsert_many(user_id, saved)
+    await _bump(user_id, index)
+    for day in {log_day(row.get("date")) for row, _ in saved}:
+        daily_summaries.mark_dirty(user_id, day)
+
+
+async def log_deleted(user_id: str, log_id: str, date=None):
+    index = vector_indexes.remove(user_id, log_id)
+    await _bump(user_id, index)
+    daily_summaries.mark_dirty(user_id, log_day(date))
+
+
+async def relationship_saved(user_id: str, relationship_id: str, name: str):
+    """
+    A relationship was created or renamed.
+    """
+    index = vector_indexes.set_relationship_name(user_id, relationship_id, name)
+    await _bump(user_id, index)
+
+
+async def relationship_deleted(user_id: str, relationship_id: str, log_dates=()):
+    """
+    A relationship and its logs were deleted. log_dates are those logs'
+    dates, as returned by the delete, so their days are re-summarized.
+    """
+    # Its logs are gone too; rebuild rather than patch
+    vector_indexes.invalidate(user_id)
+    await _bump(user_id, None)
+    for day in {log_day(date) for date in log_dates}:
+        daily_summaries.mark_dirty(user_id, day)
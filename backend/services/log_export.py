@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, List
+
+from dao.log_dao import LogDAO, decode_log_cursor, split_log_page, MAX_LOG_PAGE_SIZE
+from dao.relationship_dao import RelationshipDAO
+from services.vector_codec import parse_pgvector, encode_vector
+
+EXPORT_PAGE_SIZE = min(int(os.getenv("EXPORT_PAGE_SIZE", "200")), MAX_LOG_PAGE_SIZE)
+
+RELATIONSHIP_EXPORT_FIELDS = ("relationship_id", "name", "category_type", "email_address", "phone_number", "last_interaction_date")
+LOG_EXPORT_FIELDS = ("log_id", "relationship_id", "relationship_name", "date", "content")
+# CSV exports are one table: a `type` column plus the union of both record shapes
+CSV_EXPORT_FIELDS = ("type",) + RELATIONSHIP_EXPORT_FIELDS + tuple(
+    field for field in LOG_EXPORT_FIELDS if field not in RELATIONSHIP_EXPORT_FIELDS
+) + ("embeddings",)
+
+
+class LogExporter:
+    """
+    Exports a user's relationships and then their logs, one keyset page at a
+    time, so memory stays bounded by EXPORT_PAGE_SIZE however large the
+    account is.
+    """
+    def __init__(self, user_id: str, include_embeddings: bool = False, embedding_format: str = "list"):
+        self.user_id = user_id
+        self.include_embeddings = include_embeddings
+        self.embedding_format = embedding_format
+        self.log_dao = LogDAO()
+        self.relationship_dao = RelationshipDAO()
+
+    async def relationship_pages(self) -> AsyncIterator[List[dict]]:
+        after = None
+        while True:
+            response = await self.relationship_dao.get_page_by_user_id(self.user_id, EXPORT_PAGE_SIZE, after)
+            if response == '':
+                raise RuntimeError("Failed to load relationships for export")
+            rows = response.data or []
+            if rows:
+                yield [
+                    {"type": "relationship", **{field: row.get(field) for field in RELATIONSHIP_EXPORT_FIELDS}}
+                    for row in rows
+                ]
+            if len(rows) < EXPORT_PAGE_SIZE:
+                return
+            after = rows[-1]["relationship_id"]
+
+    async def log_pages(self) -> AsyncIterator[List[dict]]:
+        after = None
+        while True:
+            response = await self.log_dao.get_by_user_id(
+                self.user_id,
+                page_size=EXPORT_PAGE_SIZE,
+                after=after,
+                include_embeddings=self.include_embeddings
+            )
+            if response == '':
+                raise RuntimeError("Failed to load logs for export")
+            rows, next_cursor = split_log_page(response.data or [], EXPORT_PAGE_SIZE)
+            if rows:
+                yield [self._log_record(row) for row in rows]
+            if not next_cursor:
+                return
+            after = decode_log_cursor(next_cursor)
+
+    def _log_record(self, row: dict) -> dict:
+        record = {
+            "type": "log",
+            "log_id": row["log_id"],
+            "relationship_id": row["relationship_id"],
+            "relationship_name": (row.get("relationships") or {}).get("name"),
+            "date": row["date"],
+            "content": row["content"]
+        }
+        if self.include_embeddings:
+            embeddings = row.get("embeddings")
+            if embeddings is not None:
+                vector = parse_pgvector(embeddings)
+                embeddings = vector.tolist() if self.embedding_format == "list" else encode_vector(vector, self.embedding_format)
+            record["embeddings"] = embeddings
+        return record
+
+    async def pages(self) -> AsyncIterator[List[dict]]:
+        async for page in self.relationship_pages():
+            yield page
+        async for page in self.log_pages():
+            yield page
+
+    async def ndjson_chunks(self) -> AsyncIterator[str]:
+        """
+        One chunk per page, one JSON object per line.
+        """
+        async for page in self.pages():
+            yield "".join(json.dumps(record, default=str) + "\n" for record in page)
+
+    async def csv_chunks(self) -> AsyncIterator[str]:
+        """
+        A header chunk, then one chunk of rows per page. List embeddings are
+        written as JSON arrays.
+        """
+        fields = CSV_EXPORT_FIELDS if self.include_embeddings else CSV_EXPORT_FIELDS[:-1]
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        yield buffer.getvalue()
+
+        async for page in self.pages():
+            buffer.seek(0)
+            buffer.truncate()
+            for record in page:
+                if isinstance(record.get("embeddings"), list):
+                    record["embeddings"] = json.dumps(record["embeddings"])
+                writer.writerow(record)
+            yield buffer.getvalue()
+
+    def stream(self, fmt: str) -> AsyncIterator[str]:
+        return self.csv_chunks() if fmt == "csv" else self.ndjson_chunks()
@@ -0,0 +1,157 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from dao.log_dao import LogDAO
+from dao.relationship_dao import RelationshipDAO
+from services import log_changes
+from services.embeddings import get_embeddings_batch_async
+from services.vector_codec import to_pgvector
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "64"))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "50000"))
+IMPORT_FORMATS = ("csv", "jsonl")
+
+
+def iter_import_rows(stream: BinaryIO, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Lazily parse a CSV (with a header row) or JSONL upload into
+    (row number, record, parse error) tuples.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(text), start=1):
+            yield number, record, None
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, record, None
+
+
+def parse_import_date(value) -> str:
+    if not value:
+        return datetime.now(timezone.utc).isoformat()
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).isoformat()
+
+
+class LogImporter:
+    """
+    Bulk-imports a user's logs: each relationship's ownership is checked
+    once, contents are embedded a batch at a time, and each batch is one
+    multi-row insert. Yields progress and per-row error events.
+    """
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.log_dao = LogDAO()
+        self.relationship_dao = RelationshipDAO()
+        self.owned: Dict[str, bool] = {}
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+
+    async def _is_owned(self, relationship_id: str) -> bool:
+        if relationship_id not in self.owned:
+            self.owned[relationship_id] = await self.relationship_dao.is_owned_by(relationship_id, self.user_id)
+        return self.owned[relationship_id]
+
+    def _error(self, row: int, error: str) -> dict:
+        self.failed += 1
+        return {"type": "error", "row": row, "error": error}
+
+    def _progress(self, event_type: str = "progress") -> dict:
+        return {"type": event_type, "processed": self.processed, "imported": self.imported, "failed": self.failed}
+
+    async def run(self, stream: BinaryIO, fmt: str) -> AsyncIterator[dict]:
+        rows = iter_import_rows(stream, fmt)
+        while self.processed < IMPORT_MAX_ROWS:
+            limit = min(IMPORT_BATCH_SIZE, IMPORT_MAX_ROWS - self.processed)
+            try:
+                # Parsing reads the spooled file, so keep it off the event loop
+                batch = await asyncio.to_thread(lambda: list(islice(rows, limit)))
+            except (UnicodeDecodeError, csv.Error) as e:
+                yield {"type": "error", "row": None, "error": f"Could not read file: {e}"}
+                break
+            if not batch:
+                break
+            async for event in self._import_batch(batch):
+                yield event
+            yield self._progress()
+
+        if self.processed >= IMPORT_MAX_ROWS and await asyncio.to_thread(next, rows, None) is not None:
+            yield {"type": "error", "row": None, "error": f"Import stopped after {IMPORT_MAX_ROWS} rows"}
+        yield self._progress("done")
+
+    async def _import_batch(self, batch) -> AsyncIterator[dict]:
+        valid: List[Tuple[int, dict]] = []
+        for number, record, parse_error in batch:
+            self.processed += 1
+            if parse_error:
+                yield self._error(number, parse_error)
+                continue
+
+            relationship_id = str(record.get("relationship_id") or "").strip()
+            content = str(record.get("content") or "").strip()
+            if not relationship_id or not content:
+                yield self._error(number, "relationship_id and content are required")
+                continue
+            try:
+                date = parse_import_date(record.get("date"))
+            except ValueError:
+                yield self._error(number, f"Invalid date: {record.get('date')}")
+                continue
+            try:
+                # Canonical form, so it matches the log_id the database returns
+                log_id = str(uuid.UUID(str(record["log_id"]))) if record.get("log_id") else str(uuid.uuid4())
+            except ValueError:
+                yield self._error(number, f"Invalid log_id: {record.get('log_id')}")
+                continue
+            if not await self._is_owned(relationship_id):
+                yield self._error(number, "Relationship not found or not authorized")
+                continue
+
+            valid.append((number, {
+                "log_id": log_id,
+                "relationship_id": relationship_id,
+                "content": content,
+                "date": date
+            }))
+
+        if not valid:
+            return
+
+        vectors = await get_embeddings_batch_async([log["content"] for _, log in valid])
+        for (_, log), vector in zip(valid, vectors):
+            log["embeddings"] = to_pgvector(vector)
+
+        vectors_by_id = {log["log_id"]: vector for (_, log), vector in zip(valid, vectors)}
+        insert_response = await self.log_dao.create_many([log for _, log in valid])
+        if insert_response != '' and insert_response.data:
+            inserted = [(row, vectors_by_id[str(uuid.UUID(str(row["log_id"])))]) for row in insert_response.data]
+        else:
+            # One bad row fails the whole statement; retry row by row to isolate it
+            inserted = []
+            for (number, log), vector in zip(valid, vectors):
+                single = await self.log_dao.create_many([log])
+                if single != '' and single.data:
+                    inserted.append((single.data[0], vector))
+                else:
+                    yield self._error(number, "Failed to insert log")
+
+        await log_changes.logs_saved(self.user_id, inserted)
+        self.imported += len(inserted)
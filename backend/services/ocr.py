@@ -0,0 +1,44 @@
+import io
+import os
+from typing import Union
+from PIL import Image, ImageOps
+import pytesseract
+
+# Runs inside OCR worker processes, so it imports nothing beyond Pillow and pytesseract
+
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+# Longest side after downscaling; larger images cost time without helping accuracy
+OCR_MAX_DIMENSION = int(os.getenv("OCR_MAX_DIMENSION", "3000"))
+
+
+def init_ocr_worker():
+    # One pool worker per core already; keep tesseract itself single-threaded
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def preprocess_image(image: Image.Image) -> Image.Image:
+    """
+    Upright, grayscale, and no larger than needed for OCR_TARGET_DPI / OCR_MAX_DIMENSION.
+    """
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+
+    scale = 1.0
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and dpi[0] > OCR_TARGET_DPI:
+        scale = OCR_TARGET_DPI / float(dpi[0])
+    longest = max(image.size)
+    if longest * scale > OCR_MAX_DIMENSION:
+        scale = OCR_MAX_DIMENSION / float(longest)
+    if scale < 1.0:
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+    return image
+
+
+def ocr_image(source: Union[str, bytes]) -> str:
+    """
+    OCR an image given by path or raw bytes.
+    """
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as image:
+        return pytesseract.image_to_string(preprocess_image(image))
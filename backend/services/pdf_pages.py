@@ -0,0 +1,16 @@
+from typing import BinaryIO, List, Union
+from PyPDF2 import PdfReader
+
+# Runs inside PDF worker processes, so it imports nothing beyond PyPDF2
+
+
+def extract_page_range(source: Union[str, BinaryIO], start: int, stop: int) -> List[str]:
+    """
+    Extract the text of pages [start, stop) of a PDF, one string per page.
+    """
+    reader = PdfReader(source)
+    return [reader.pages[i].extract_text() or "" for i in range(start, min(stop, len(reader.pages)))]
+
+
+def count_pages(source: Union[str, BinaryIO]) -> int:
+    return len(PdfReader(source).pages)
@@ -0,0 +1,80 @@
+import heapq
+from operator import itemgetter
+from typing import Dict, Hashable, List, NamedTuple, Tuple
+
+
+class RankedSource(NamedTuple):
+    """
+    One retriever's results, best first, with the key holding its raw score
+    and the weight it carries in the fused ranking.
+    """
+    results: List[dict]
+    score_key: str
+    weight: float
+
+
+def result_identity(row: dict) -> Hashable:
+    """
+    Identify the same log across retrievers.
+    """
+    return row.get("log_id") or row.get("id") or (row.get("date"), row.get("content"))
+
+
+def _accumulate(sources: List[RankedSource], contribution) -> Tuple[Dict[Hashable, float], Dict[Hashable, dict]]:
+    fused: Dict[Hashable, float] = {}
+    rows: Dict[Hashable, dict] = {}
+    for source in sources:
+        for row, value in contribution(source):
+            key = result_identity(row)
+            fused[key] = fused.get(key, 0.0) + value
+            # Keep every retriever's raw score on the merged row
+            rows[key] = {**rows.get(key, {}), **row}
+    return fused, rows
+
+
+def reciprocal_rank_fusion(sources: List[RankedSource], rrf_k: float = 60.0):
+    """
+    score(d) = sum over sources of weight / (rrf_k + rank(d)), rank starting at 1.
+    """
+    def contribution(source: RankedSource):
+        for rank, row in enumerate(source.results, start=1):
+            yield row, source.weight / (rrf_k + rank)
+    return _accumulate(sources, contribution)
+
+
+def weighted_score_fusion(sources: List[RankedSource]):
+    """
+    score(d) = sum over sources of weight * min-max normalized raw score.
+    """
+    def contribution(source: RankedSource):
+        raw = [float(row.get(source.score_key) or 0.0) for row in source.results]
+        if not raw:
+            return
+        low, high = min(raw), max(raw)
+        spread = high - low
+        for row, value in zip(source.results, raw):
+            normalized = (value - low) / spread if spread > 0 else 1.0
+            yield row, source.weight * normalized
+    return _accumulate(sources, contribution)
+
+
+def fuse(
+    sources: List[RankedSource],
+    top_k: int,
+    method: str = "rrf",
+    score_key: str = "hybrid_score",
+    rrf_k: float = 60.0
+) -> List[dict]:
+    """
+    Merge several ranked result lists and return the top_k rows, best first,
+    each carrying its fused score under score_key. Uses a heap, not a full sort.
+    """
+    if method == "rrf":
+        fused, rows = reciprocal_rank_fusion(sources, rrf_k)
+    elif method == "weighted":
+        fused, rows = weighted_score_fusion(sources)
+    else:
+        raise ValueError(f"Invalid fusion method: {method}")
+
+    best = heapq.nlargest(top_k, fused.items(), key=itemgetter(1))
+    return [{**rows[key], score_key: score} for key, score in best]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Hashable, Optional, Tuple
+
+from core.generation_store import GenerationStore, MemoryGenerationStore, create_generation_store
+from core.limiter import RATE_LIMIT_STORAGE_URI
+from core.ttl_cache import TTLCache
+
+
+class SearchResultCache:
+    """
+    Caches search responses (ranked results plus llm_answer) per
+    (user, query, search_type, match_count, params). Each user has a
+    generation counter that is part of the key; bumping it on any log write
+    makes all of that user's earlier entries unreachable at once. With a
+    shared generation store, a write in one worker invalidates every worker.
+    """
+    def __init__(self, ttl: float, max_entries: int, generations: GenerationStore):
+        self.entries = TTLCache(ttl=ttl, max_entries=max_entries)
+        self.generations = generations
+        self.hits = 0
+        self.misses = 0
+
+    async def key(self, user_id: str, query: str, search_type: str, match_count: int, params: Optional[dict]) -> Hashable:
+        """
+        The cache key for a search, pinned to the user's current generation.
+        Take it before ranking so a write during the search makes the
+        result uncacheable rather than cached under the new generation.
+        """
+        if isinstance(self.generations, MemoryGenerationStore):
+            generation = self.generations.get(str(user_id))
+        else:
+            generation = await asyncio.to_thread(self.generations.get, str(user_id))
+        return (
+            str(user_id),
+            generation,
+            query,
+            search_type.lower(),
+            match_count,
+            json.dumps(params or {}, sort_keys=True, default=str)
+        )
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self.entries.set(key, value)
+
+    async def invalidate_user(self, user_id: str) -> Optional[Tuple[int, int]]:
+        """
+        Bump the user's generation and return (previous, current). A failure
+        is logged and returns None rather than raising: the write that
+        triggered it has already succeeded, and stale entries still expire
+        after the TTL.
+        """
+        try:
+            if isinstance(self.generations, MemoryGenerationStore):
+                return self.generations.bump(str(user_id))
+            return await asyncio.to_thread(self.generations.bump, str(user_id))
+        except Exception as e:
+            print(f"[ERROR] Failed to invalidate search cache for {user_id}: {e}", file=sys.stderr)
+            return None
+
+
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+
+search_cache = SearchResultCache(
+    ttl=SEARCH_CACHE_TTL,
+    max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000")),
+    # memory:// is per worker; use the shared rate limit store when running several
+    generations=create_generation_store(
+        os.getenv("SEARCH_CACHE_STORAGE_URI") or RATE_LIMIT_STORAGE_URI, SEARCH_CACHE_TTL
+    )
+)
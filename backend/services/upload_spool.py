@@ -0,0 +1,48 @@
+import os
+import tempfile
+from typing import BinaryIO, IO, Optional
+
+from fastapi import HTTPException
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+def spool_upload(
+    source: BinaryIO,
+    file_name: Optional[str] = None,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    directory: Optional[str] = None,
+    delete: bool = True
+) -> IO[bytes]:
+    """
+    Copy an upload to a named temporary file on disk, UPLOAD_CHUNK_SIZE bytes
+    at a time, so memory use doesn't grow with the file. Raises 413 once more
+    than max_bytes have been read. The returned file is positioned at the
+    start and is deleted when closed, unless delete is False (the caller
+    then owns the file at .name).
+    """
+    suffix = f"_{os.path.basename(file_name)}" if file_name else ""
+    spooled = tempfile.NamedTemporaryFile(suffix=suffix, dir=directory, delete=delete)
+    try:
+        written = 0
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File too large (limit {max_bytes // (1024 * 1024)} MB)"
+                )
+            spooled.write(chunk)
+        spooled.flush()
+        spooled.seek(0)
+        return spooled
+    except BaseException:
+        spooled.close()
+        if not delete:
+            os.remove(spooled.name)
+        raise
+
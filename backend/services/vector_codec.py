@@ -0,0 +1,66 @@
+import base64
+from typing import Union
+
+import numpy as np
+
+# 9 significant digits round-trips any float32 exactly, at roughly half the
+# characters of Python's float64 repr of the same value.
+PGVECTOR_FORMAT = "%.9g"
+
+WIRE_FORMATS = ("float32", "float16", "int8")
+INT8_SCALE = 127.0  # embeddings are unit-normalized, so components lie in [-1, 1]
+
+
+def as_float32(vector) -> np.ndarray:
+    """
+    View (or convert) a vector as a contiguous float32 array without copying when possible.
+    """
+    return np.ascontiguousarray(vector, dtype=np.float32)
+
+
+def to_pgvector(vector) -> str:
+    """
+    Serialize a vector as a compact pgvector text literal, e.g. '[0.1,0.2]'.
+    """
+    values = as_float32(vector).tolist()
+    return "[" + ",".join([PGVECTOR_FORMAT] * len(values)) % tuple(values) + "]"
+
+
+def parse_pgvector(value: Union[str, list, np.ndarray]) -> np.ndarray:
+    """
+    Parse a pgvector literal (or list/array) into a float32 array in C.
+    """
+    if isinstance(value, str):
+        return np.fromstring(value.strip("[]"), dtype=np.float32, sep=",")
+    return as_float32(value)
+
+
+def encode_vector(vector, wire_format: str = "float32") -> str:
+    """
+    Base64-encode a vector as little-endian float32, float16 or int8 bytes.
+    """
+    vector = as_float32(vector)
+    if wire_format == "float32":
+        data = vector.astype("<f4", copy=False)
+    elif wire_format == "float16":
+        data = vector.astype("<f2")
+    elif wire_format == "int8":
+        data = np.clip(np.rint(vector * INT8_SCALE), -127, 127).astype(np.int8)
+    else:
+        raise ValueError(f"Unsupported embedding format: {wire_format}")
+    return base64.b64encode(data.tobytes()).decode("ascii")
+
+
+def decode_vector(encoded: str, wire_format: str = "float32") -> np.ndarray:
+    """
+    Decode a base64 vector produced by encode_vector. float32 input is
+    returned as a read-only view over the decoded bytes (no element copy).
+    """
+    raw = base64.b64decode(encoded)
+    if wire_format == "float32":
+        return np.frombuffer(raw, dtype="<f4")
+    if wire_format == "float16":
+        return np.frombuffer(raw, dtype="<f2").astype(np.float32)
+    if wire_format == "int8":
+        return np.frombuffer(raw, dtype=np.int8).astype(np.float32) / INT8_SCALE
+    raise ValueError(f"Unsupported embedding format: {wire_format}")
@@ -0,0 +1,558 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from core.executors import run_inference
+from core.generation_store import GenerationStore, MemoryGenerationStore
+from dao.log_dao import LogDAO, split_log_page
+from services.embeddings import EMBEDDING_DIM
+from services.search_cache import search_cache
+from services.vector_codec import parse_pgvector
+
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR") or None
+# Indexes are rebuilt when the user's log generation moves on; this bounds
+# staleness if a generation bump is lost
+VECTOR_INDEX_TTL = float(os.getenv("VECTOR_INDEX_TTL", "300"))
+VECTOR_INDEX_MAX_USERS = int(os.getenv("VECTOR_INDEX_MAX_USERS", "256"))
+# Below this many vectors an exact scan is already sub-millisecond
+VECTOR_INDEX_IVF_MIN = int(os.getenv("VECTOR_INDEX_IVF_MIN", "20000"))
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+BUILD_PAGE_SIZE = 1000
+# A build that raced with writes is retried this many times before being served uncached
+BUILD_ATTEMPTS = 3
+
+
+def _train_ivf(vectors: np.ndarray, nlist: int, iterations: int = 10):
+    """
+    Spherical k-means over unit vectors; returns (centroids, assignments).
+    """
+    rng = np.random.default_rng(0)
+    sample = vectors
+    if len(vectors) > nlist * 256:
+        sample = vectors[rng.choice(len(vectors), nlist * 256, replace=False)]
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / np.linalg.norm(sums[filled], axis=1, keepdims=True)
+
+    return centroids, np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+
+
+def _save_array(directory: str, name: str, array: np.ndarray):
+    # Write-then-rename, so readers that memory-mapped the old file keep a valid mapping
+    tmp_path = os.path.join(directory, f"{name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.asarray(array))
+    os.replace(tmp_path, os.path.join(directory, name))
+
+
+class VectorIndex:
+    """
+    In-memory semantic index over one user's logs. Uses an exact scan, or an
+    IVF coarse quantizer once the index holds VECTOR_INDEX_IVF_MIN vectors.
+    Rows are kept dense: deletes move the last row into the hole.
+    `generation` is the user's log generation the contents reflect.
+    """
+    def __init__(
+        self,
+        dim: int,
+        vectors: np.ndarray,
+        meta: List[dict],
+        names: Dict[str, str],
+        built_at: float,
+        generation: Optional[int] = None
+    ):
+        self.dim = dim
+        self.vectors = vectors
+        self.meta = meta
+        self.names = names
+        self.built_at = built_at
+        self.generation = generation
+        self.positions = {row["log_id"]: i for i, row in enumerate(meta)}
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self.dirty = False
+        # Bumped on every mutation, so off-loop training can tell if it went stale
+        self.version = 0
+
+    def __len__(self):
+        return len(self.meta)
+
+    def train(self):
+        n = len(self)
+        if n < VECTOR_INDEX_IVF_MIN:
+            self.centroids = self.assignments = None
+            return
+        self.centroids, self.assignments = _train_ivf(self.vectors[:n], int(np.sqrt(n)))
+        self.trained_size = n
+
+    def needs_training(self) -> bool:
+        # Re-train the coarse quantizer once the index has doubled
+        return len(self) >= VECTOR_INDEX_IVF_MIN and len(self) >= 2 * self.trained_size
+
+    def apply_training(self, centroids: np.ndarray, assignments: np.ndarray, version: int) -> bool:
+        """
+        Install a quantizer trained off the event loop, unless the index
+        changed while it trained.
+        """
+        if version != self.version:
+            return False
+        self.centroids = centroids
+        self.assignments = np.resize(assignments, len(self.vectors))
+        self.trained_size = len(assignments)
+        return True
+
+    def search(self, query: np.ndarray, k: int) -> List[dict]:
+        n = len(self)
+        if n == 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+
+        candidates = None
+        if self.centroids is not None:
+            nprobe = min(VECTOR_INDEX_NPROBE, len(self.centroids))
+            probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+            candidates = np.flatnonzero(np.isin(self.assignments[:n], probe))
+            scores = self.vectors[candidates] @ query
+        else:
+            scores = self.vectors[:n] @ query
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            row = self.meta[candidates[i] if candidates is not None else i]
+            results.append({
+                **row,
+                "name": self.names.get(row["relationship_id"]),
+                "semantic_score": float(scores[i])
+            })
+        return results
+
+    def upsert(self, row: dict, vector: np.ndarray) -> bool:
+        """
+        Add or replace a log. Returns False if the relationship is unknown to
+        this index (its name isn't loaded), in which case the caller rebuilds.
+        """
+        if row["relationship_id"] not in self.names:
+            return False
+        self._make_writable()
+        meta = {key: row.get(key) for key in ("log_id", "relationship_id", "content", "date")}
+        position = self.positions.get(row["log_id"])
+
+        if position is None:
+            position = len(self)
+            if position == len(self.vectors):
+                grown = np.empty((max(16, 2 * len(self.vectors)), self.dim), dtype=np.float32)
+                grown[:position] = self.vectors[:position]
+                self.vectors = grown
+            self.meta.append(meta)
+            self.positions[row["log_id"]] = position
+            if self.assignments is not None and len(self.assignments) < len(self.vectors):
+                self.assignments = np.resize(self.assignments, len(self.vectors))
+        else:
+            self.meta[position] = meta
+
+        self.vectors[position] = vector
+        if self.centroids is not None:
+            self.assignments[position] = int(np.argmax(self.centroids @ vector))
+        self.dirty = True
+        self.version += 1
+        return True
+
+    def remove(self, log_id: str):
+        position = self.positions.pop(log_id, None)
+        if position is None:
+            return
+        self._make_writable()
+        last = len(self) - 1
+        if position != last:
+            self.vectors[position] = self.vectors[last]
+            self.meta[position] = self.meta[last]
+            self.positions[self.meta[position]["log_id"]] = position
+            if self.assignments is not None:
+                self.assignments[position] = self.assignments[last]
+        self.meta.pop()
+        self.dirty = True
+        self.version += 1
+
+    def _make_writable(self):
+        # Indexes loaded from disk are read-only memory maps until first mutation
+        if not self.vectors.flags.writeable:
+            self.vectors = np.array(self.vectors)
+        if self.assignments is not None and not self.assignments.flags.writeable:
+            self.assignments = np.array(self.assignments)
+
+    def snapshot(self) -> "VectorIndex":
+        """
+        A copy that later mutations can't touch, for saving off the event loop.
+        Meta rows are replaced rather than mutated, so a shallow list copy suffices.
+        """
+        n = len(self)
+        copy = VectorIndex(
+            self.dim, np.array(self.vectors[:n]), list(self.meta), dict(self.names), self.built_at, self.generation
+        )
+        if self.centroids is not None:
+            copy.centroids = self.centroids
+            copy.assignments = np.array(self.assignments[:n])
+            copy.trained_size = self.trained_size
+        return copy
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        n = len(self)
+        _save_array(directory, "vectors.npy", self.vectors[:n])
+        if self.centroids is not None:
+            _save_array(directory, "centroids.npy", self.centroids)
+            _save_array(directory, "assignments.npy", self.assignments[:n])
+        else:
+            for name in ("centroids.npy", "assignments.npy"):
+                if os.path.exists(os.path.join(directory, name)):
+                    os.remove(os.path.join(directory, name))
+        # meta.json is written last; its presence marks a complete index
+        tmp_path = os.path.join(directory, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "built_at": self.built_at,
+                "generation": self.generation,
+                "meta": self.meta,
+                "names": self.names
+            }, f)
+        os.replace(tmp_path, os.path.join(directory, "meta.json"))
+        self.dirty = False
+
+    @classmethod
+    def load(cls, directory: str, dim: int) -> Optional["VectorIndex"]:
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        if vectors.shape[0] != len(saved["meta"]):
+            return None
+
+        index = cls(dim, vectors, saved["meta"], saved["names"], saved["built_at"], saved.get("generation"))
+        centroids_path = os.path.join(directory, "centroids.npy")
+        if os.path.exists(centroids_path):
+            index.centroids = np.load(centroids_path)
+            index.assignments = np.load(os.path.join(directory, "assignments.npy"), mmap_mode="r")
+            index.trained_size = len(index)
+        return index
+
+
+class VectorIndexManager:
+    """
+    Lazily builds, caches (LRU by user) and persists per-user vector indexes.
+    Loading, saving, deleting and training run off the event loop; a user's
+    disk operations are chained so they happen in order.
+
+    An index is current while its generation matches the user's generation
+    in the shared GenerationStore (bumped on every log write, by any
+    worker). Writes applied in place advance a loaded index's generation;
+    anything else leaves it behind, and the next search rebuilds it.
+    """
+    def __init__(
+        self,
+        dim: int,
+        generations: GenerationStore,
+        directory: Optional[str] = None,
+        ttl: float = 300,
+        max_users: int = 256
+    ):
+        self.dim = dim
+        self.generations = generations
+        self.directory = directory
+        self.ttl = ttl
+        self.max_users = max_users
+        self.indexes: "OrderedDict[str, VectorIndex]" = OrderedDict()
+        self.build_locks: Dict[str, asyncio.Lock] = {}
+        # Writes seen per user while that user's index is being loaded or built
+        self.writes_during_build: Dict[str, int] = {}
+        self.disk_ops: Dict[str, asyncio.Task] = {}
+        self.training: Set[str] = set()
+        self.tasks: Set[asyncio.Task] = set()
+
+    def _user_dir(self, user_id: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, hashlib.sha256(str(user_id).encode()).hexdigest()[:32])
+
+    async def _generation(self, user_id: str) -> Optional[int]:
+        """
+        The user's current log generation, or None if the store is
+        unreachable (freshness then falls back to the TTL alone).
+        """
+        try:
+            if isinstance(self.generations, MemoryGenerationStore):
+                return self.generations.get(user_id)
+            return await asyncio.to_thread(self.generations.get, user_id)
+        except Exception as e:
+            print(f"[ERROR] Failed to read log generation for {user_id}: {e}", file=sys.stderr)
+            return None
+
+    def _fresh(self, index: VectorIndex, generation: Optional[int]) -> bool:
+        if generation is not None and index.generation != generation:
+            return False
+        return time.time() - index.built_at < self.ttl
+
+    async def get(self, user_id: str) -> VectorIndex:
+        user_id = str(user_id)
+        index = self.indexes.get(user_id)
+        if index is not None and self._fresh(index, await self._generation(user_id)):
+            self.indexes.move_to_end(user_id)
+            return index
+
+        lock = self.build_locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self.indexes.get(user_id)
+            if index is None or not self._fresh(index, await self._generation(user_id)):
+                index, current = await self._load_or_build(user_id)
+                if current:
+                    self._remember(user_id, index)
+            return index
+
+    def _track(self, task: asyncio.Task) -> asyncio.Task:
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def _disk(self, user_id: str, fn: Callable, *args) -> asyncio.Task:
+        """
+        Run a blocking disk operation for a user in a thread, after any
+        earlier one for the same user.
+        """
+        previous = self.disk_ops.get(user_id)
+
+        async def run():
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            return await asyncio.to_thread(fn, *args)
+
+        task = self._track(asyncio.create_task(run()))
+        self.disk_ops[user_id] = task
+
+        def forget(done: asyncio.Task):
+            if self.disk_ops.get(user_id) is done:
+                del self.disk_ops[user_id]
+            if not done.cancelled() and done.exception() is not None:
+                print(f"[ERROR] Vector index disk operation for {user_id} failed: {done.exception()}", file=sys.stderr)
+        task.add_done_callback(forget)
+        return task
+
+    def _note_write(self, user_id: str):
+        if user_id in self.writes_during_build:
+            self.writes_during_build[user_id] += 1
+
+    async def _load_or_build(self, user_id: str) -> Tuple[VectorIndex, bool]:
+        """
+        Returns (index, current). An index that a concurrent write may have
+        missed is rebuilt; if writes keep racing, the last attempt is
+        returned with current=False so it serves this call but isn't cached.
+        """
+        user_dir = self._user_dir(user_id)
+        for _ in range(BUILD_ATTEMPTS):
+            self.writes_during_build[user_id] = 0
+            try:
+                # Read before the logs, so a write after this point leaves the index behind
+                generation = await self._generation(user_id)
+                index = None
+                if user_dir:
+                    try:
+                        index = await self._disk(user_id, VectorIndex.load, user_dir, self.dim)
+                    except (OSError, ValueError) as e:
+                        print(f"[ERROR] Failed to load vector index for {user_id}: {e}", file=sys.stderr)
+                if index is None or not self._fresh(index, generation):
+                    index = await self._build(user_id, generation)
+                    built = True
+                else:
+                    built = False
+                if self.writes_during_build[user_id] == 0:
+                    if built and user_dir:
+                        self._save(user_id, index, user_dir)
+                    return index, True
+            finally:
+                self.writes_during_build.pop(user_id, None)
+        return index, False
+
+    async def _build(self, user_id: str, generation: Optional[int]) -> VectorIndex:
+        built_at = time.time()
+        logDao = LogDAO()
+        rows, names, after = [], {}, None
+        while True:
+            logs_response = await logDao.get_by_user_id(
+                user_id, page_size=BUILD_PAGE_SIZE, after=after, include_embeddings=True
+            )
+            page, next_cursor = split_log_page(logs_response.data, BUILD_PAGE_SIZE)
+            for row in page:
+                if row.get("embeddings"):
+                    rows.append(row)
+                names[row["relationship_id"]] = (row.get("relationships") or {}).get("name")
+            if not next_cursor:
+                break
+            after = (page[-1]["date"], page[-1]["log_id"])
+
+        def build():
+            vectors = np.empty((len(rows), self.dim), dtype=np.float32)
+            for i, row in enumerate(rows):
+                vectors[i] = parse_pgvector(row["embeddings"])
+            meta = [{key: row.get(key) for key in ("log_id", "relationship_id", "content", "date")} for row in rows]
+            index = VectorIndex(self.dim, vectors, meta, names, built_at, generation)
+            index.train()
+            return index
+
+        # Parsing and IVF training are CPU-bound, keep them off the event loop
+        return await run_inference(build)
+
+    def _remember(self, user_id: str, index: VectorIndex):
+        self.indexes[user_id] = index
+        self.indexes.move_to_end(user_id)
+        while len(self.indexes) > self.max_users:
+            evicted_user, evicted = self.indexes.popitem(last=False)
+            self._save_if_dirty(evicted_user, evicted)
+
+    def _save(self, user_id: str, index: VectorIndex, user_dir: str):
+        snapshot = index.snapshot()
+        index.dirty = False
+        self._disk(user_id, snapshot.save, user_dir)
+
+    def _save_if_dirty(self, user_id: str, index: VectorIndex):
+        user_dir = self._user_dir(user_id)
+        if user_dir and index.dirty:
+            self._save(user_id, index, user_dir)
+
+    def _maybe_train(self, user_id: str, index: VectorIndex):
+        """
+        Re-train a grown index's quantizer on the inference executor. If the
+        index changed meanwhile the result is dropped and training restarts
+        from the current contents.
+        """
+        if user_id in self.training or not index.needs_training():
+            return
+        self.training.add(user_id)
+        n, version, vectors = len(index), index.version, index.vectors
+
+        async def train():
+            applied = True
+            try:
+                centroids, assignments = await run_inference(_train_ivf, vectors[:n], int(np.sqrt(n)))
+                applied = index.apply_training(centroids, assignments, version)
+            except Exception as e:
+                print(f"[ERROR] Vector index training for {user_id} failed: {e}", file=sys.stderr)
+            finally:
+                self.training.discard(user_id)
+            if not applied and self.indexes.get(user_id) is index:
+                self._maybe_train(user_id, index)
+
+        self._track(asyncio.create_task(train()))
+
+    def upsert(self, user_id: str, row: dict, vector: np.ndarray) -> Optional[VectorIndex]:
+        """
+        Apply a created/updated log to a loaded index. Returns the index it
+        was applied to, or None if there was none (or it had to be dropped).
+        """
+        return self.upsert_many(user_id, [(row, vector)])
+
+    def upsert_many(self, user_id: str, saved: List[Tuple[dict, np.ndarray]]) -> Optional[VectorIndex]:
+        """
+        Apply a batch of (row, vector) to a loaded index, as upsert().
+        """
+        user_id = str(user_id)
+        self._note_write(user_id)
+        index = self.indexes.get(user_id)
+        if index is None:
+            return None
+        if not all(index.upsert(row, np.asarray(vector, dtype=np.float32)) for row, vector in saved):
+            self.indexes.pop(user_id, None)
+            return None
+        self._maybe_train(user_id, index)
+        return index
+
+    def remove(self, user_id: str, log_id: str) -> Optional[VectorIndex]:
+        user_id = str(user_id)
+        self._note_write(user_id)
+        index = self.indexes.get(user_id)
+        if index is not None:
+            index.remove(str(log_id))
+        return index
+
+    def set_relationship_name(self, user_id: str, relationship_id: str, name: str) -> Optional[VectorIndex]:
+        """
+        Record a created or renamed relationship so its logs resolve to the right name.
+        """
+        user_id = str(user_id)
+        self._note_write(user_id)
+        index = self.indexes.get(user_id)
+        if index is not None:
+            index.names[str(relationship_id)] = name
+            index.dirty = True
+        return index
+
+    def advance(self, user_id: str, index: Optional[VectorIndex], bumped: Optional[Tuple[int, int]]):
+        """
+        Called once a write has bumped the user's generation; bumped is the
+        store's (previous, current), or None if the bump failed. An index the
+        write was applied to moves to the new generation, unless another
+        write bumped it in between. Unloaded indexes on disk need nothing:
+        their generation is now behind.
+        """
+        user_id = str(user_id)
+        if bumped is None:
+            # The generation did not move, so nothing else would mark the on-disk copy stale
+            self.invalidate(user_id)
+            return
+        previous, current = bumped
+        if index is not None and self.indexes.get(user_id) is index and index.generation == previous:
+            index.generation = current
+            index.dirty = True
+
+    def invalidate(self, user_id: str):
+        """
+        Drop a user's in-memory and on-disk index; the next search rebuilds it.
+        """
+        user_id = str(user_id)
+        self._note_write(user_id)
+        self.indexes.pop(user_id, None)
+        user_dir = self._user_dir(user_id)
+        if user_dir:
+            self._disk(user_id, shutil.rmtree, user_dir, True)
+
+    def flush(self):
+        """
+        Persist dirty indexes synchronously (on shutdown).
+        """
+        for user_id, index in self.indexes.items():
+            user_dir = self._user_dir(user_id)
+            if user_dir and index.dirty:
+                try:
+                    index.save(user_dir)
+                except OSError as e:
+                    print(f"[ERROR] Failed to persist vector index for {user_id}: {e}", file=sys.stderr)
+
+
+vector_indexes = VectorIndexManager(
+    EMBEDDING_DIM,
+    # The search cache's per-user generations are bumped on every log write
+    generations=search_cache.generations,
+    directory=VECTOR_INDEX_DIR,
+    ttl=VECTOR_INDEX_TTL,
+    max_users=VECTOR_INDEX_MAX_USERS
+)
@@ -0,0 +1,16 @@
+-- One materialized LLM summary per user per (UTC) day. source_hash identifies
+-- the logs it was generated from, so it is only regenerated when they change.
+
+create table if not exists daily_summaries (
+    summary_id uuid primary key default gen_random_uuid(),
+    user_id uuid not null references users (user_id) on delete cascade,
+    summary_date date not null,
+    summary_content text not null,
+    source_hash text not null,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now(),
+    unique (user_id, summary_date)
+);
+
+-- Day-range scans for the daily summary scheduler
+create index if not exists logs_date_idx on logs (date);
@@ -0,0 +1,70 @@
+-- Log mutations that enforce relationship ownership server-side, so each
+-- write is a single PostgREST round-trip. Each function returns the affected
+-- row (update_owned_log: see below), or no rows when the relationship/log
+-- does not belong to p_user_id.
+
+create or replace function create_owned_log(
+    p_user_id uuid,
+    p_relationship_id uuid,
+    p_content text,
+    p_date timestamptz,
+    p_embeddings vector(384),
+    p_log_id uuid default null
+)
+returns setof logs
+language sql
+as $$
+    insert into logs (log_id, relationship_id, content, date, embeddings)
+    select coalesce(p_log_id, gen_random_uuid()), r.relationship_id, p_content, p_date, p_embeddings
+    from relationships r
+    where r.relationship_id = p_relationship_id
+      and r.user_id = p_user_id
+    returning *;
+$$;
+
+-- Returns the updated row as `log` plus the log's date before the update as
+-- `previous_date`, so callers can refresh the day it moved away from without
+-- reading it first. The return type changed, so replace it explicitly.
+drop function if exists update_owned_log(uuid, uuid, text, vector, timestamptz);
+
+create function update_owned_log(
+    p_user_id uuid,
+    p_log_id uuid,
+    p_content text,
+    p_embeddings vector(384),
+    p_date timestamptz default null
+)
+returns table (log logs, previous_date timestamptz)
+language sql
+as $$
+    with previous as (
+        select l.log_id, l.date
+        from logs l
+        join relationships r on r.relationship_id = l.relationship_id
+        where l.log_id = p_log_id
+          and r.user_id = p_user_id
+        for update of l
+    )
+    update logs l
+    set content = p_content,
+        embeddings = p_embeddings,
+        date = coalesce(p_date, l.date)
+    from previous p
+    where l.log_id = p.log_id
+    returning l, p.date;
+$$;
+
+create or replace function delete_owned_log(
+    p_user_id uuid,
+    p_log_id uuid
+)
+returns setof logs
+language sql
+as $$
+    delete from logs l
+    using relationships r
+    where l.log_id = p_log_id
+      and r.relationship_id = l.relationship_id
+      and r.user_id = p_user_id
+    returning l.*;
+$$;
@@ -0,0 +1,22 @@
+-- Deletes a relationship only if it belongs to p_user_id and returns it with
+-- the dates of the logs deleted along with it, in one round-trip. Returns
+-- no rows when the relationship does not belong to p_user_id. The main query
+-- sees the logs as they were before the statement, so log_dates is complete.
+
+create or replace function delete_owned_relationship(
+    p_user_id uuid,
+    p_relationship_id uuid
+)
+returns table (relationship_id uuid, log_dates timestamptz[])
+language sql
+as $$
+    with deleted as (
+        delete from relationships r
+        where r.relationship_id = p_relationship_id
+          and r.user_id = p_user_id
+        returning r.relationship_id
+    )
+    select d.relationship_id,
+           array(select l.date from logs l where l.relationship_id = d.relationship_id)
+    from deleted d;
+$$;
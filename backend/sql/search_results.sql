@@ -0,0 +1,15 @@
+-- Compact record of each search: the ranked log ids (not the rows) and the
+-- LLM answer, so a past search can be re-opened with one indexed read.
+
+create table if not exists search_results (
+    id uuid primary key default gen_random_uuid(),
+    user_id uuid not null references users (user_id) on delete cascade,
+    query text not null,
+    search_type text,
+    log_ids uuid[] not null default '{}',
+    scores real[] not null default '{}',
+    ai_summary text,
+    search_date timestamptz not null default now()
+);
+
+create index if not exists search_results_user_date_idx on search_results (user_id, search_date desc);